@@ -13,7 +13,8 @@ sys.path.insert(0, str(PROJECT_ROOT))
 from app.core.config import settings
 from app.database.database import Base
 
-from app.database.models import UserModel, OrderModel  # noqa: F401
+from app.database.models import UserModel, OrderModel, OrderArchiveModel, OrderOutboxModel  # noqa: F401
+from app.services.order_partitions import is_order_partition
 
 config = context.config
 
@@ -23,6 +24,13 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    # секции orders создаёт job обслуживания, в моделях их нет - autogenerate не должен их удалять
+    if type_ == "table" and reflected and compare_to is None and is_order_partition(name):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     url = settings.database_url
     context.configure(
@@ -31,6 +39,7 @@ def run_migrations_offline() -> None:
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -42,6 +51,7 @@ def do_run_migrations(connection) -> None:
         connection=connection,
         target_metadata=target_metadata,
         compare_type=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -0,0 +1,33 @@
+"""orders version and updated_at
+
+Revision ID: 5c1d9e7a3f20
+Revises: b3af4452bb02
+Create Date: 2026-10-18 14:22:05.613870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d9e7a3f20'
+down_revision: Union[str, Sequence[str], None] = 'b3af4452bb02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('orders', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    # существующие заказы: время изменения не известно, берём время создания
+    op.execute('UPDATE orders SET updated_at = created_at')
+    op.create_index('ix_orders_user_id_updated_at', 'orders', ['user_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_user_id_updated_at', table_name='orders')
+    op.drop_column('orders', 'updated_at')
+    op.drop_column('orders', 'version')
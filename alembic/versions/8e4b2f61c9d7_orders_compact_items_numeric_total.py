@@ -0,0 +1,63 @@
+"""orders compact items and numeric total_price
+
+Revision ID: 8e4b2f61c9d7
+Revises: 5c1d9e7a3f20
+Create Date: 2026-10-18 16:05:41.208374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4b2f61c9d7'
+down_revision: Union[str, Sequence[str], None] = '5c1d9e7a3f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'orders', 'total_price',
+        existing_type=sa.Float(),
+        type_=sa.Numeric(12, 2),
+        existing_nullable=False,
+        postgresql_using='round(total_price::numeric, 2)',
+    )
+    # список объектов -> колонки {"v", "n", "q", "p"}, цены в целых копейках
+    op.execute("""
+        UPDATE orders SET items = (
+            SELECT jsonb_build_object(
+                'v', 1,
+                'n', coalesce(jsonb_agg(e->'name_product' ORDER BY i), '[]'::jsonb),
+                'q', coalesce(jsonb_agg(e->'count_product' ORDER BY i), '[]'::jsonb),
+                'p', coalesce(jsonb_agg(round((e->>'price_product')::numeric * 100)::bigint ORDER BY i), '[]'::jsonb)
+            )
+            FROM jsonb_array_elements(items) WITH ORDINALITY AS t(e, i)
+        )
+        WHERE jsonb_typeof(items) = 'array'
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("""
+        UPDATE orders SET items = (
+            SELECT coalesce(jsonb_agg(jsonb_build_object(
+                'name_product', items->'n'->i,
+                'count_product', items->'q'->i,
+                'price_product', (items->'p'->>i)::numeric / 100
+            ) ORDER BY i), '[]'::jsonb)
+            FROM generate_series(0, jsonb_array_length(items->'n') - 1) AS i
+        )
+        WHERE jsonb_typeof(items) = 'object'
+    """)
+    op.alter_column(
+        'orders', 'total_price',
+        existing_type=sa.Numeric(12, 2),
+        type_=sa.Float(),
+        existing_nullable=False,
+        postgresql_using='total_price::double precision',
+    )
@@ -0,0 +1,117 @@
+"""orders range partitioning and archive
+
+Revision ID: a7f3c2d85e14
+Revises: 8e4b2f61c9d7
+Create Date: 2026-10-18 17:48:12.904511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7f3c2d85e14'
+down_revision: Union[str, Sequence[str], None] = '8e4b2f61c9d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_ORDER_INDEXES = ('ix_orders_user_id_created_at_id', 'ix_orders_user_id_updated_at')
+_COLUMNS = 'id, user_id, items, total_price, status, created_at, version, updated_at'
+
+
+def _order_columns() -> list[sa.Column]:
+    return [
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('items', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('total_price', sa.Numeric(12, 2), nullable=False),
+        sa.Column('status', postgresql.ENUM(name='order_status', create_type=False), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # таблицу нельзя сделать секционированной на месте: создаём новую и переносим строки
+    op.rename_table('orders', 'orders_legacy')
+    op.execute('ALTER TABLE orders_legacy RENAME CONSTRAINT orders_pkey TO orders_legacy_pkey')
+    op.execute('ALTER TABLE orders_legacy RENAME CONSTRAINT orders_user_id_fkey TO orders_legacy_user_id_fkey')
+    for index in _ORDER_INDEXES:
+        op.execute(f'ALTER INDEX {index} RENAME TO {index}_legacy')
+
+    op.create_table('orders',
+    *_order_columns(),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    # ключ партиционирования обязан входить в первичный ключ
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)',
+    )
+    op.create_index('ix_orders_user_id_created_at_id', 'orders', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_user_id_updated_at', 'orders', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_orders_closed_updated_at', 'orders', ['updated_at'], unique=False,
+                    postgresql_where=sa.text("status IN ('SHIPPED', 'CANCELED')"))
+
+    # секции по месяцам (UTC) от самого старого заказа до трёх месяцев вперёд,
+    # дальше их создаёт app/order_maintenance.py
+    op.execute("""
+        DO $$
+        DECLARE
+            part_month timestamp := date_trunc('month', coalesce((SELECT min(created_at) FROM orders_legacy), now()) AT TIME ZONE 'UTC');
+            last_month timestamp := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months';
+        BEGIN
+            WHILE part_month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF orders FOR VALUES FROM (%L) TO (%L)',
+                    'orders_p' || to_char(part_month, 'YYYYMM'),
+                    part_month AT TIME ZONE 'UTC',
+                    (part_month + interval '1 month') AT TIME ZONE 'UTC'
+                );
+                part_month := part_month + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+    # страховка: без неё вставка за пределами созданных секций упала бы
+    op.execute('CREATE TABLE orders_default PARTITION OF orders DEFAULT')
+
+    op.execute(f'INSERT INTO orders ({_COLUMNS}) SELECT {_COLUMNS} FROM orders_legacy')
+    op.drop_table('orders_legacy')
+
+    op.create_table('orders_archive',
+    *_order_columns(),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_orders_archive_user_id_created_at', 'orders_archive', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('orders_plain',
+    *_order_columns(),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # архивные заказы возвращаются в общую таблицу
+    op.execute(f'INSERT INTO orders_plain ({_COLUMNS}) SELECT {_COLUMNS} FROM orders')
+    op.execute(f'INSERT INTO orders_plain ({_COLUMNS}) SELECT {_COLUMNS} FROM orders_archive')
+    op.drop_index('ix_orders_archive_user_id_created_at', table_name='orders_archive')
+    op.drop_table('orders_archive')
+    # секции удаляются вместе с родительской таблицей
+    op.drop_table('orders')
+
+    op.rename_table('orders_plain', 'orders')
+    op.execute('ALTER TABLE orders RENAME CONSTRAINT orders_plain_pkey TO orders_pkey')
+    op.execute('ALTER TABLE orders RENAME CONSTRAINT orders_plain_user_id_fkey TO orders_user_id_fkey')
+    op.create_index('ix_orders_user_id_created_at_id', 'orders', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_user_id_updated_at', 'orders', ['user_id', 'updated_at'], unique=False)
@@ -0,0 +1,30 @@
+"""orders keyset index
+
+Revision ID: b3af4452bb02
+Revises: f0ab8bc4a2cf
+Create Date: 2026-10-18 11:03:27.402915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3af4452bb02'
+down_revision: Union[str, Sequence[str], None] = 'f0ab8bc4a2cf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_user_id_created_at_id', 'orders', ['user_id', 'created_at', 'id'], unique=False)
+    # составной индекс начинается с user_id, отдельный индекс больше не нужен
+    op.drop_index(op.f('ix_orders_user_id'), table_name='orders')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_orders_user_id'), 'orders', ['user_id'], unique=False)
+    op.drop_index('ix_orders_user_id_created_at_id', table_name='orders')
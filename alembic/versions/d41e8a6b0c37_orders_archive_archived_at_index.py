@@ -0,0 +1,27 @@
+"""orders_archive user_id, archived_at index
+
+Revision ID: d41e8a6b0c37
+Revises: a7f3c2d85e14
+Create Date: 2026-10-18 16:40:12.304518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41e8a6b0c37'
+down_revision: Union[str, Sequence[str], None] = 'a7f3c2d85e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_archive_user_id_archived_at', 'orders_archive', ['user_id', 'archived_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_archive_user_id_archived_at', table_name='orders_archive')
@@ -0,0 +1,38 @@
+"""order outbox
+
+Revision ID: f0ab8bc4a2cf
+Revises: 776b7de046f4
+Create Date: 2026-10-18 10:12:41.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0ab8bc4a2cf'
+down_revision: Union[str, Sequence[str], None] = '776b7de046f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('order_outbox',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('order_id', sa.UUID(), nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_order_outbox_pending', 'order_outbox', ['id'], unique=False, postgresql_where=sa.text('sent_at IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_order_outbox_pending', table_name='order_outbox', postgresql_where=sa.text('sent_at IS NULL'))
+    op.drop_table('order_outbox')
@@ -1,19 +1,44 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.database.session import get_database
+from app.core.tracing import span, traced
+from app.database.session import asyncSessionLocal, get_database
 from app.database.models.user_model import UserModel
+from app.services.cache_users import UserPrincipal, get_cached_user, set_cached_user
+from app.services.read_your_writes import read_sessionmaker_for
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token/")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/token/", auto_error=False)
 
+@traced("get_current_user")
 async def get_current_user(
+        request: Request,
         token: str = Depends(oauth2_scheme),
         db: AsyncSession = Depends(get_database)
-) -> UserModel:
+) -> UserPrincipal:
+    return await _user_from_token(request, token, db)
+
+
+async def get_stream_user(
+        request: Request,
+        token: str | None = Depends(oauth2_scheme_optional),
+        access_token: str | None = Query(None),
+) -> UserPrincipal:
+    # EventSource в браузере не умеет заголовки - токен можно передать в ?access_token=
+    token = token or access_token
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный токен")
+
+    # своя короткая сессия: соединение из пула не должно жить всё время SSE-подключения
+    async with asyncSessionLocal() as db:
+        return await _user_from_token(request, token, db)
+
+
+async def _user_from_token(request: Request, token: str, db: AsyncSession) -> UserPrincipal:
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
         sub = payload.get("sub")
@@ -23,11 +48,35 @@ async def get_current_user(
         
     except (JWTError, ValueError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный токен")
-    
-    res = await db.execute(select(UserModel).where(UserModel.id == user_id))
-    user = res.scalar_one_or_none()
 
-    if not user:
+    # лимиты запросов считаются по пользователю, а не по IP балансировщика
+    request.state.user_id = user_id
+
+    # подпись уже проверена - при включённой опции доверяем claims без поиска пользователя
+    email = payload.get("email")
+    if settings.AUTH_TRUST_JWT_CLAIMS and email:
+        return UserPrincipal(id=user_id, email=email)
+
+    user = await get_cached_user(user_id)
+    if user:
+        return user
+
+    # сессия берёт соединение из пула только здесь, при промахе кеша
+    res = await db.execute(select(UserModel.id, UserModel.email).where(UserModel.id == user_id))
+    row = res.one_or_none()
+
+    if not row:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Пользолватель не найден")
-    
+
+    user = UserPrincipal(id=row.id, email=row.email)
+    await set_cached_user(user)
     return user
+
+
+async def get_read_database(user: UserPrincipal = Depends(get_current_user)):
+    # сессия на реплике для обработчиков только на чтение,
+    # сразу после записи пользователя - на primary
+    with span("get_read_database"):
+        session_factory = await read_sessionmaker_for(user.id)
+    async with session_factory() as session:
+        yield session
@@ -3,9 +3,10 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.rate_limit import limiter
 
-from app.core.security import create_access_token, do_hash_password, verify_password
+from app.core.security import create_access_token, password_hasher
 from app.database.models.user_model import UserModel
 from app.database.session import get_database
 from app.schemas.auth import RegisterIn, TokenOut, UserOut
@@ -14,13 +15,13 @@ from app.schemas.auth import RegisterIn, TokenOut, UserOut
 auth_router = APIRouter(tags=["auth"])
 
 @auth_router.post("/register/", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-@limiter.limit("5/minute")  # ограничение на регистрацию: 5 запросов в минуту с одного IP
+@limiter.limit(settings.RATE_LIMIT_REGISTER)  # ограничение на регистрацию с одного IP
 async def register(request: Request, data: RegisterIn, db: AsyncSession = Depends(get_database)):
     res = await db.execute(select(UserModel).where(UserModel.email == data.email))
     if res.scalar_one_or_none():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Пользователь с таким email уже существует")
 
-    user = UserModel(email = data.email, hash_password=do_hash_password(data.password))
+    user = UserModel(email = data.email, hash_password=await password_hasher.hash(data.password))
     db.add(user)
     await db.commit()
     await db.refresh(user)
@@ -28,13 +29,22 @@ async def register(request: Request, data: RegisterIn, db: AsyncSession = Depend
     return UserOut(id=user.id, email=user.email)
 
 @auth_router.post("/token/", response_model=TokenOut)
-@limiter.limit("5/minute")
+@limiter.limit(settings.RATE_LIMIT_LOGIN)
 async def login(request: Request, form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_database)):
     res = await db.execute(select(UserModel).where(UserModel.email == form.username))
     user = res.scalar_one_or_none()
 
-    if not user or not verify_password(form.password, user.hash_password):
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверные логин или пароль")
 
-    token = create_access_token(user.id)
+    valid, new_hash = await password_hasher.verify_and_update(form.password, user.hash_password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверные логин или пароль")
+
+    # хеш со старыми параметрами bcrypt прозрачно обновляем при успешном входе
+    if new_hash:
+        user.hash_password = new_hash
+        await db.commit()
+
+    token = create_access_token(user.id, user.email)
     return TokenOut(access_token=token, token_type="bearer")
\ No newline at end of file
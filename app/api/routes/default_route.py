@@ -1,26 +1,63 @@
-from sqlalchemy import text
-from fastapi import APIRouter, Depends, Request
-from sqlalchemy.ext.asyncio import AsyncSession
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 
 from app.api.deps import get_current_user
 
+from app.core.config import settings
+from app.core.metrics import render_metrics
+from app.core.tracing import recent_traces
 from app.core.rate_limit import limiter
 
-from app.database.session import get_database as get_db
+from app.database.session import pool_status
+from app.lifespan import resources
 from app.schemas.auth import UserOut
+from app.services.cache_orders import get_cache_stats
 
 default_router = APIRouter(tags=["default"])
 
-@default_router.get("/home/database/")
-@limiter.limit("1/minute")
-async def check_db(request: Request, db: AsyncSession = Depends(get_db)):
-
-    # не по требованию SQL-ORM, а просто для проверки подключения к БД
-    result = await db.execute(text("SELECT 1"))
-
-    return {"db_result": result.scalar()}
+@default_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@default_router.get("/admin/traces/")
+async def traces(
+    limit: int = Query(50, ge=1, le=settings.TRACE_BUFFER_SIZE),
+    x_admin_token: str = Header(""),
+):
+    # последние медленные трассировки этого процесса, новые первыми
+    if not settings.ADMIN_TOKEN or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа")
+    return {"traces": recent_traces(limit)}
+
+@default_router.get("/health/live")
+async def liveness():
+    # процесс жив и event loop отвечает; зависимости не проверяются, чтобы их сбой не вызывал рестарт
+    return {"status": "ok"}
+
+@default_router.get("/health/ready")
+async def readiness(response: Response):
+    # трафик можно слать: пулы прогреты, БД и Redis отвечают, процесс не останавливается
+    checks = await resources.readiness()
+    ready = resources.ready and all(checks.values())
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "not_ready", "draining": resources.draining, "checks": checks}
+
+@default_router.get("/home/database/pool/")
+@limiter.limit(settings.RATE_LIMIT_DIAGNOSTICS)
+async def database_pool(request: Request):
+    # занятые соединения, overflow и время ожидания соединения из пула
+    return pool_status()
+
+@default_router.get("/home/cache/")
+@limiter.limit(settings.RATE_LIMIT_DIAGNOSTICS)
+async def cache_stats(request: Request):
+    # счётчики попаданий/промахов/вытеснений кеша заказов в этом процессе
+    return get_cache_stats()
 
 @default_router.get("/fetch_me/", response_model=UserOut)
-@limiter.limit("10/minute")
+@limiter.limit(settings.RATE_LIMIT_DIAGNOSTICS)
 async def fetch_me(request: Request, user = Depends(get_current_user)):
     return UserOut(id=user.id, email=user.email)
\ No newline at end of file
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Header, Request
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import get_stream_user
+from app.core.config import settings
+from app.core.rate_limit import limiter
+from app.services.order_updates import sse_stream
+
+
+order_updates_router = APIRouter(tags=["orders"])
+
+
+# роутер подключается раньше orders_router: иначе путь совпал бы с /orders/{order_id}/
+@order_updates_router.get("/orders/updates/")
+@limiter.limit(settings.RATE_LIMIT_ORDER_UPDATES)
+async def order_updates(
+    request: Request,
+    last_event_id: str | None = Header(None),
+    user = Depends(get_stream_user),
+):
+    # изменения статусов заказов пользователя (SSE) вместо опроса GET /orders/{order_id}/
+    return StreamingResponse(
+        sse_stream(user.id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
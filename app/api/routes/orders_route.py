@@ -1,19 +1,43 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Literal
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Select, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
 import logging
 
 from app.core.rate_limit import limiter
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_read_database
+from app.core.config import settings
+from app.core.tracing import current_trace_id
 from app.database.session import get_database
 from app.database.models.order_model import OrderModel, OrderStatus
+from app.database.models.outbox_model import OrderOutboxModel
+from app.database.repositories.order_read_repository import (
+    ORDER_COLUMNS,
+    decode_cursor,
+    fetch_archived_order,
+    fetch_order,
+    fetch_last_modified,
+    fetch_order_owner,
+    fetch_page,
+    stream_rows,
+    user_orders_query,
+)
 from app.schemas import order
-from app.schemas.order import OrderCreateIn, OrderPatchIn
-from app.services.cache_orders import get_cached_order, set_cached_order
-from app.services.rabbit_publisher import publish_new_order
+from app.schemas.order import OrderBatchCreateIn, OrderCreateIn, OrderPatchIn, order_status
+from app.services.cache_orders import CachedOrder, get_order_cached
+from app.services.order_items import pack_items
+from app.services.order_payload import order_to_cache, order_to_dict, order_to_json
+from app.services.order_summary import created_deltas, get_daily_buckets, get_status_summary, status_change_deltas
+from app.services.order_updates import publish_order_updates
+from app.services.order_writes import publish_order_writes
 
 
 orders_router = APIRouter(tags=["orders"])
@@ -21,80 +45,201 @@ orders_router = APIRouter(tags=["orders"])
 # инициализация логгера для заказов
 logger = logging.getLogger("orders") 
 
-def order_to_dict(order: OrderModel) -> dict:
+
+# клиент обязан перепроверять ответ (ETag / Last-Modified), общие кеши его не хранят
+_CACHE_CONTROL = "private, no-cache"
+# Last-Modified с точностью до секунды: для только что изменённых данных не отдаём,
+# иначе второе изменение в ту же секунду осталось бы незамеченным
+_LAST_MODIFIED_SETTLE = timedelta(seconds=2)
+
+
+def _order_response(entry: CachedOrder, status_code: int = status.HTTP_200_OK) -> Response:
+    # закешированные байты уходят клиенту как есть
+    return Response(
+        content=entry.body,
+        status_code=status_code,
+        media_type="application/json",
+        headers={"ETag": entry.etag, "Cache-Control": _CACHE_CONTROL},
+    )
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _last_modified_headers(last_modified: datetime | None) -> dict[str, str]:
+    if last_modified is None:
+        return {}
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    if last_modified > datetime.now(timezone.utc) - _LAST_MODIFIED_SETTLE:
+        return {}
     return {
-        "id": str(order.id),
-        "user_id": order.user_id,
-        "items": order.items,
-        "total_price": order.total_price,
-        "status": order.status.value if hasattr(order.status, "value") else str(order.status),
-        "created_at": order.created_at.isoformat() if order.created_at else None,
+        "Last-Modified": format_datetime(last_modified.astimezone(timezone.utc), usegmt=True),
+        "Cache-Control": _CACHE_CONTROL,
     }
 
 
+def _not_modified_since(if_modified_since: str | None, last_modified: datetime) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def _event_payload(order_id: UUID) -> dict:
+    # id трассировки запроса едет через outbox в заголовки rabbitmq и метки TaskIQ
+    payload = {"order_id": str(order_id)}
+    trace_id = current_trace_id()
+    if trace_id:
+        payload["trace_id"] = trace_id
+    return payload
+
+
 @orders_router.post("/orders/", status_code=status.HTTP_201_CREATED)
-@limiter.limit("10/minute")
+@limiter.limit(settings.RATE_LIMIT_ORDER_CREATE)
 async def create_order(
     request: Request,
     data: OrderCreateIn,
     user = Depends(get_current_user),
     db: AsyncSession = Depends(get_database)
 ):
-    # перебор классов товаров из data
-    items_payload = [item.model_dump() for item in data.items]
+    # INSERT ... RETURNING вместо commit + refresh: серверные значения (created_at, status, version)
+    # приходят сразу, а refresh по составному ключу (id, created_at) не нужен
+    res = await db.execute(
+        insert(OrderModel)
+        .values(id=uuid.uuid4(), user_id=user.id, items=pack_items(data.items), total_price=data.total_price)
+        .returning(*ORDER_COLUMNS)
+    )
+    order = res.one()
+
+    # событие new_order пишем в outbox в той же транзакции,
+    # в rabbitmq его отправит outbox relay
+    db.add(OrderOutboxModel(order_id=order.id, event_type="new_order", payload=_event_payload(order.id)))
 
-    order = OrderModel(user_id=user.id, items=items_payload, total_price=data.total_price)
-    db.add(order)
     await db.commit()
-    await db.refresh(order)
 
-    payload = order_to_dict(order)
-    await set_cached_order(order.id, payload)
+    entry = order_to_cache(order)
+    await publish_order_writes([entry], created_deltas(user.id, [order.total_price]), user.id, invalidate=True)
 
     logger.info("Заказ создан id=%s user_id=%s total=%s", order.id, order.user_id, order.total_price)
-    logger.info("Отправка в RABBITMQ order_id=%s", order.id)
 
-    # добавляем сообщение о новом заказе в очередь rabbitmq
-    await publish_new_order(order.id)
-    
-    return payload
+    # тело уже сериализовано для кеша, повторно не кодируем
+    return _order_response(entry, status.HTTP_201_CREATED)
+
+
+@orders_router.post("/orders/batch/", status_code=status.HTTP_207_MULTI_STATUS)
+@limiter.limit(settings.RATE_LIMIT_ORDER_BATCH)
+async def create_orders_batch(
+    request: Request,
+    data: OrderBatchCreateIn,
+    user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_database)
+):
+    results: list[dict] = [{"index": i} for i in range(len(data.orders))]
+    valid: list[tuple[int, OrderCreateIn]] = []
+
+    for i, raw in enumerate(data.orders):
+        try:
+            valid.append((i, OrderCreateIn.model_validate(raw)))
+        except ValidationError as e:
+            results[i]["ok"] = False
+            results[i]["errors"] = [{"loc": err["loc"], "msg": err["msg"], "type": err["type"]} for err in e.errors()]
+
+    if valid:
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "user_id": user.id,
+                "items": pack_items(item_in.items),
+                "total_price": item_in.total_price,
+                "status": OrderStatus.PENDING,
+            }
+            for _, item_in in valid
+        ]
+
+        # один INSERT ... RETURNING на все заказы и один INSERT в outbox, одна транзакция
+        res = await db.execute(
+            insert(OrderModel).values(rows).returning(*ORDER_COLUMNS)
+        )
+        created = {row.id: row for row in res.all()}
+
+        await db.execute(insert(OrderOutboxModel).values([
+            {"order_id": row["id"], "event_type": "new_order", "payload": _event_payload(row["id"])}
+            for row in rows
+        ]))
+        await db.commit()
+
+        inserted = [created[row["id"]] for row in rows]
+        await publish_order_writes(
+            [order_to_cache(row) for row in inserted],
+            created_deltas(user.id, [row["total_price"] for row in rows]),
+            user.id,
+        )
+
+        for (i, _), row in zip(valid, inserted):
+            results[i]["ok"] = True
+            results[i]["order"] = order_to_dict(row)
+
+    logger.info("Пачка заказов user_id=%s создано=%s из %s", user.id, len(valid), len(data.orders))
+
+    return ORJSONResponse(
+        {"created": len(valid), "failed": len(data.orders) - len(valid), "results": results},
+        status_code=status.HTTP_207_MULTI_STATUS,
+    )
 
 
 @orders_router.get("/orders/{order_id}/")
-@limiter.limit("10/minute")
+@limiter.limit(settings.RATE_LIMIT_ORDER_GET, pipelined=True)
 async def get_order(
     request: Request,
     order_id: UUID,
+    if_none_match: str | None = Header(None),
     user = Depends(get_current_user),
-    db: AsyncSession = Depends(get_database)
+    db: AsyncSession = Depends(get_read_database)
 ):
-    cached = await get_cached_order(str(order_id))
-    if cached:
-        if cached.get("user_id") != user.id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этому заказу")
-        
-        # логируем попадание в кэш
-        logger.info("!!!Redis find order with id=%s!!!", order_id)
-
-        return cached
-    
-    logger.info("!!!Redis not find order with id=%s!!!", order_id)
-    
-    res = await db.execute(select(OrderModel).where(OrderModel.id == order_id))
-    order = res.scalar_one_or_none()
-
-    if not order:
+    async def load_order() -> CachedOrder | None:
+        row = await fetch_order(db, order_id)
+        if row is None:
+            # закрытые заказы job обслуживания переносит в архив, читаем их оттуда
+            row = await fetch_archived_order(db, order_id)
+        return order_to_cache(row) if row else None
+
+    # память процесса -> redis -> БД, одновременные промахи по одному заказу схлопываются.
+    # проверка лимита уходит в redis одним pipeline с чтением кеша
+    rate_check = limiter.check(request, "get_order", settings.RATE_LIMIT_ORDER_GET)
+    entry = await get_order_cached(order_id, load_order, rate_check)
+
+    if entry is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Заказ не найден")
-    if order.user_id != user.id:
+    if entry.user_id != user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этому заказу")
-    
-    payload = order_to_dict(order)
-    await set_cached_order(str(order.id), payload)
-    return payload
+
+    # опрашивающий клиент с актуальной версией получает 304 без тела
+    if _etag_matches(if_none_match, entry.etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": entry.etag, "Cache-Control": _CACHE_CONTROL},
+        )
+
+    return _order_response(entry)
 
 
 @orders_router.patch("/orders/{order_id}/")
-@limiter.limit("20/minute")
+@limiter.limit(settings.RATE_LIMIT_ORDER_PATCH)
 async def patch_order(
     request: Request,
     order_id: UUID,
@@ -102,38 +247,124 @@ async def patch_order(
     user = Depends(get_current_user),
     db: AsyncSession = Depends(get_database)
 ):
-    res = await db.execute(select(OrderModel).where(OrderModel.id == order_id))
-    order = res.scalar_one_or_none()
+    # один условный UPDATE ... RETURNING вместо SELECT + commit + refresh.
+    # подзапрос блокирует строку и отдаёт прежний статус для счётчиков сводки
+    previous = (
+        select(OrderModel.id, OrderModel.status.label("old_status"))
+        .where(OrderModel.id == order_id)
+        .with_for_update()
+        .subquery()
+    )
+    query = (
+        update(OrderModel)
+        .where(OrderModel.id == previous.c.id, OrderModel.user_id == user.id)
+        .values(status=OrderStatus(data.status), version=OrderModel.version + 1)
+        .returning(*ORDER_COLUMNS, previous.c.old_status)
+        .execution_options(synchronize_session=False)
+    )
+    if data.expected_status is not None:
+        query = query.where(previous.c.old_status == OrderStatus(data.expected_status))
 
-    if not order:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Заказ не найден")
-    
-    if order.user_id != user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этому заказу")
-    
-    order.status = OrderStatus(data.status)
+    res = await db.execute(query)
+    row = res.one_or_none()
     await db.commit()
-    await db.refresh(order)
 
-    payload = order_to_dict(order)
-    await set_cached_order(str(order.id), payload)
-    return payload
+    if row is None:
+        # строка не обновилась - разбираемся почему, это уже не горячий путь
+        current = await fetch_order_owner(db, order_id)
+
+        if not current:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Заказ не найден")
+        if current.user_id != user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этому заказу")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Статус заказа изменился, текущий статус {current.status.value}",
+        )
+
+    entry = order_to_cache(row)
+    await publish_order_writes(
+        [entry], status_change_deltas(user.id, row.old_status, row.status, row.total_price), user.id, invalidate=True,
+    )
+    await publish_order_updates([row])
+    return _order_response(entry)
 
 
 @orders_router.get("/orders/user/{user_id}/")
-@limiter.limit("20/minute")
+@limiter.limit(settings.RATE_LIMIT_ORDER_LIST)
 async def get_user_orders(
     request: Request,
     user_id: int,
+    limit: int = Query(50, ge=1, le=settings.ORDER_PAGE_MAX_SIZE),
+    cursor: str | None = None,
+    status_filter: order_status | None = Query(None, alias="status"),
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    format: Literal["json", "ndjson"] = "json",
+    if_modified_since: str | None = Header(None),
     user = Depends(get_current_user),
-    db: AsyncSession = Depends(get_database)
+    db: AsyncSession = Depends(get_read_database)
+):
+    if user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этим заказам")
+
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный cursor")
+
+    # одна выборка max(updated_at) по индексу вместо страницы заказов, если у клиента всё актуально
+    last_modified = await fetch_last_modified(db, user_id)
+    headers = _last_modified_headers(last_modified)
+    if headers and _not_modified_since(if_modified_since, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    query = user_orders_query(user_id, status_filter, created_from, created_to, after)
+
+    if format == "ndjson":
+        return StreamingResponse(_stream_orders(db.bind, query), media_type="application/x-ndjson", headers=headers)
+
+    rows, next_cursor = await fetch_page(db, query, limit)
+
+    # строки из колонок сразу в orjson, без jsonable_encoder
+    return ORJSONResponse({"items": [order_to_dict(row) for row in rows], "next_cursor": next_cursor}, headers=headers)
+
+
+async def _stream_orders(bind: AsyncEngine, query: Select):
+    # отдельная сессия на том же движке (реплика или primary):
+    # ответ стримится уже после выхода из зависимостей запроса
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        async for row in stream_rows(session, query, settings.ORDER_STREAM_CHUNK_SIZE):
+            yield order_to_json(row) + b"\n"
+
+
+@orders_router.get("/orders/user/{user_id}/summary/")
+@limiter.limit(settings.RATE_LIMIT_ORDER_SUMMARY)
+async def get_user_orders_summary(
+    request: Request,
+    user_id: int,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_database)
 ):
     if user_id != user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этим заказам")
-    
-    res = await db.execute(select(OrderModel).
-                           where(OrderModel.user_id == user_id).
-                           order_by(OrderModel.created_at.desc()))
-    
-    orders = res.scalars().all()
-    return [order_to_dict(o) for o in orders]
\ No newline at end of file
+
+    # даты без часового пояса считаем UTC: сравнение naive и aware datetime падает с TypeError
+    if date_to is not None and date_to.tzinfo is None:
+        date_to = date_to.replace(tzinfo=timezone.utc)
+    if date_from is not None and date_from.tzinfo is None:
+        date_from = date_from.replace(tzinfo=timezone.utc)
+
+    date_to = date_to or datetime.now(timezone.utc)
+    date_from = date_from or date_to - timedelta(days=settings.ORDER_SUMMARY_DEFAULT_DAYS)
+    if date_from >= date_to or date_to - date_from > timedelta(days=settings.ORDER_SUMMARY_MAX_DAYS):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Неверный диапазон дат")
+
+    return ORJSONResponse({
+        "by_status": await get_status_summary(user_id),
+        "date_from": date_from,
+        "date_to": date_to,
+        "days": await get_daily_buckets(db, user_id, date_from, date_to),
+    })
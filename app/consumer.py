@@ -1,13 +1,24 @@
 ﻿import asyncio
-import json
 import logging
-from uuid import UUID
-from typing import Any, Dict, Optional, Union
+import signal
+from typing import Awaitable, Callable, Optional
 
 import aio_pika
+from aio_pika.abc import AbstractIncomingMessage, AbstractQueue
 
 from app.core.config import settings
-from app.tasks import message_broker, process_order
+from app.core.metrics import (
+    CONSUMER_BATCH_SIZE,
+    CONSUMER_DISPATCH_SECONDS,
+    CONSUMER_IN_FLIGHT,
+    CONSUMER_MESSAGES,
+    CONSUMER_QUEUE_DEPTH,
+    start_metrics_server,
+    timed,
+)
+from app.core.tracing import TRACE_ID_HEADER
+from app.services.order_events import decode_order_event
+from app.tasks import message_broker, process_orders
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,6 +26,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger("consumer")
 
+_messages_ok = CONSUMER_MESSAGES.labels("ok")
+_messages_invalid = CONSUMER_MESSAGES.labels("invalid")
+_messages_failed = CONSUMER_MESSAGES.labels("failed")
+
 
 # на случай если контейнер rabbitmq поднимается дольше остальных сервисов
 # добавим переподключение
@@ -32,65 +47,214 @@ async def conn_withretry():
             await asyncio.sleep(10)
 
 
-def _parse_payload(raw: str) -> Optional[Dict[str, Any]]:
+def _extract_order_id(message: AbstractIncomingMessage) -> Optional[str]:
+    # декодер выбирается по content-type, подробный лог только на DEBUG
     try:
-        payload: Union[Dict[str, Any], str] = json.loads(raw)
-    except json.JSONDecodeError:
+        event = decode_order_event(message.body, message.content_type)
+    except ValueError as e:
+        logger.warning("Невалидное сообщение delivery_tag=%s: %s", message.delivery_tag, e)
         return None
 
-    # если пришла JSON-строка, внутри которой ещё один JSON
-    if isinstance(payload, str):
-        return {"order_id": payload}
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Сообщение получено event=%s order_id=%s", event.event_type, event.order_id)
 
-    # вариант: {"order_id": "..."}
-    if isinstance(payload, dict):
-        return payload
+    return str(event.order_id)
 
-    return None
 
+class AckTracker:
+    """Копит подтверждения и отправляет их одним basic.ack(multiple=True).
 
-async def main() -> None:
-    await message_broker.startup()
-    conn = await conn_withretry()
+    Подтвердить можно только непрерывный префикс: всё, что меньше
+    самого раннего ещё не обработанного delivery tag.
+    """
 
-    try:
-        channel = await conn.channel()
-        queue = await channel.declare_queue(settings.NEW_ORDER_QUEUE, durable=True)
+    def __init__(self) -> None:
+        self._inflight: set[int] = set()
+        self._done: dict[int, AbstractIncomingMessage] = {}
+        self._last_tag = 0
+        # ack ждёт отправки в сокет: параллельные flush иначе подтвердили бы tag дважды
+        # или отправили multiple-ack не по порядку - брокер закрыл бы канал
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        # полученные и ещё не подтверждённые брокеру сообщения
+        return len(self._inflight) + len(self._done)
+
+    def track(self, message: AbstractIncomingMessage) -> None:
+        # tag меньше уже виденного - канал переоткрылся, старые неподтверждённые
+        # сообщения брокер доставит заново
+        if message.delivery_tag <= self._last_tag:
+            self._inflight.clear()
+            self._done.clear()
+        self._last_tag = message.delivery_tag
+        self._inflight.add(message.delivery_tag)
+
+    async def done(self, messages: list[AbstractIncomingMessage]) -> None:
+        for message in messages:
+            self._inflight.discard(message.delivery_tag)
+            self._done[message.delivery_tag] = message
+        await self._flush()
+
+    async def failed(self, messages: list[AbstractIncomingMessage]) -> None:
+        for message in messages:
+            await message.nack(requeue=True)
+            self._inflight.discard(message.delivery_tag)
+        await self._flush()
+
+    async def _flush(self) -> None:
+        async with self._flush_lock:
+            if not self._done:
+                return
+
+            floor = min(self._inflight) if self._inflight else None
+            ready = [tag for tag in self._done if floor is None or tag < floor]
+            if not ready:
+                return
+
+            # забираем до await: пока ack уходит, done() других обработчиков меняет _done
+            last = max(ready)
+            message = self._done[last]
+            for tag in ready:
+                del self._done[tag]
+            await message.ack(multiple=True)
+
+
+class OrderConsumer:
+    """Обрабатывает сообщения new_order пулом обработчиков.
+
+    Каждый обработчик забирает из внутренней очереди всё, что уже
+    пришло (до batch_size), и ставит одну задачу TaskIQ на пачку.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[list[str], list[str]], Awaitable[None]],
+        concurrency: int,
+        batch_size: int,
+    ) -> None:
+        self._dispatch = dispatch
+        self._concurrency = concurrency
+        self._batch_size = batch_size
+
+        self._queue: "asyncio.Queue[AbstractIncomingMessage]" = asyncio.Queue()
+        self._acks = AckTracker()
+        self._workers: list[asyncio.Task] = []
 
-        async with queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                async with message.process():
-                    raw = message.body.decode("utf-8")
+    @property
+    def unacked(self) -> int:
+        return len(self._acks)
 
-                    logger.info("2. Сообщение получено =%s", raw)
+    def start(self) -> None:
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._concurrency)]
 
-                    payload = _parse_payload(raw)
+    async def on_message(self, message: AbstractIncomingMessage) -> None:
+        # количество сообщений в очереди ограничено prefetch_count канала
+        self._acks.track(message)
+        self._queue.put_nowait(message)
+
+    async def drain(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Не дождались обработки %s сообщений, они вернутся в очередь", self._queue.qsize())
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def _worker(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                await self._handle(batch)
+            except Exception:
+                # ошибка ack/nack (например, закрытый канал) не должна останавливать обработчик:
+                # неподтверждённые сообщения брокер доставит заново
+                logger.exception("Ошибка подтверждения пачки из %s сообщений", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _handle(self, batch: list[AbstractIncomingMessage]) -> None:
+        # невалидные сообщения подтверждаем: повторная доставка их не исправит
+        order_ids = [order_id for order_id in map(_extract_order_id, batch) if order_id]
+        # id трассировок запросов, создавших заказы, передаём дальше в метки задачи
+        trace_ids = [trace_id for message in batch if (trace_id := (message.headers or {}).get(TRACE_ID_HEADER))]
+        if len(order_ids) < len(batch):
+            _messages_invalid.inc(len(batch) - len(order_ids))
+
+        try:
+            if order_ids:
+                logger.info("Отправка задачи в TaskIQ, заказов=%s trace_ids=%s", len(order_ids), trace_ids or "-")
+                CONSUMER_BATCH_SIZE.observe(len(order_ids))
+                with timed(CONSUMER_DISPATCH_SECONDS):
+                    await self._dispatch(order_ids, trace_ids)
+        except Exception:
+            logger.exception("Не удалось поставить задачу в TaskIQ, сообщения вернутся в очередь")
+            _messages_failed.inc(len(order_ids))
+            await self._acks.failed(batch)
+        else:
+            _messages_ok.inc(len(order_ids))
+            await self._acks.done(batch)
+
+
+async def dispatch_to_taskiq(order_ids: list[str], trace_ids: list[str]) -> None:
+    # одна запись в redis stream на всю пачку
+    if trace_ids:
+        await process_orders.kicker().with_labels(trace_ids=",".join(trace_ids)).kiq(order_ids)
+    else:
+        await process_orders.kiq(order_ids)
 
-                    logger.info("3. Payload декодирован =%s тип =%s", payload, type(payload))
 
-                    if payload is None:
-                        print("Невалидный JSON/формат сообщения:", raw)
-                        continue
+async def watch_queue_depth(queue: AbstractQueue, interval: float) -> None:
+    # отставание consumer: сколько сообщений ждёт в очереди брокера
+    while True:
+        try:
+            declared = await queue.declare()
+            CONSUMER_QUEUE_DEPTH.set(declared.message_count)
+        except Exception:
+            logger.warning("Не удалось получить размер очереди %s", queue.name)
+        await asyncio.sleep(interval)
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
 
-                    order_id = payload.get("order_id")
+    start_metrics_server(settings.METRICS_PORT)
+    await message_broker.startup()
+    conn = await conn_withretry()
 
-                    logger.info("4. Извлечен order_id=%s", order_id)
+    consumer = OrderConsumer(
+        dispatch_to_taskiq,
+        concurrency=settings.CONSUMER_CONCURRENCY,
+        batch_size=settings.CONSUMER_BATCH_SIZE,
+    )
+    CONSUMER_IN_FLIGHT.set_function(lambda: consumer.unacked)
 
-                    if order_id is None:
-                        print("Нет order_id в сообщении:", payload)
-                        continue
+    try:
+        channel = await conn.channel()
+        await channel.set_qos(prefetch_count=settings.CONSUMER_PREFETCH_COUNT)
+        queue = await channel.declare_queue(settings.NEW_ORDER_QUEUE, durable=True)
 
-                    try:
-                        order_id_uuid = UUID(str(order_id))
-                    except (TypeError, ValueError):
-                        print("order_id не UUID:", payload)
-                        continue
+        consumer.start()
+        consumer_tag = await queue.consume(consumer.on_message)
+        depth = asyncio.create_task(watch_queue_depth(queue, settings.CONSUMER_QUEUE_DEPTH_INTERVAL_SECONDS))
 
-                    logger.info("5. Отправка задачи в TaskIQ, order_id=%s", order_id)
+        await stop.wait()
+        depth.cancel()
 
-                    # отправляем задачу в TaskIQ
-                    await process_order.kiq(str(order_id_uuid))
+        # новые сообщения больше не принимаем, дорабатываем уже полученные
+        logger.info("Остановка consumer, дообработка сообщений")
+        await queue.cancel(consumer_tag)
+        await consumer.drain(settings.CONSUMER_DRAIN_TIMEOUT_SECONDS)
     finally:
+        await conn.close()
         await message_broker.shutdown()
 
 
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,17 +8,125 @@ class Settings(BaseSettings):
 
     database_url: str
 
+    # config for database engine
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    # совместимость с pgbouncer в transaction mode: без prepared statements и своего пула
+    DB_PGBOUNCER_MODE: bool = False
+    # реплики для чтения через запятую, пусто - всё читается с primary
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_HEALTH_INTERVAL_SECONDS: float = 5
+    DB_REPLICA_HEALTH_TIMEOUT_SECONDS: float = 2
+    # сколько после записи пользователя его чтения идут на primary
+    READ_YOUR_WRITES_SECONDS: int = 5
+
     # config for JWT
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # доверять подписанным claims токена и не искать пользователя вовсе
+    AUTH_TRUST_JWT_CLAIMS: bool = False
+
+    # config for password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32
 
     # config for redis
     REDIS_URL: str
     ORDER_CACHE_EXPIRE_SECONDS: int
+    ORDER_LOCAL_CACHE_TTL_SECONDS: int = 5
+    ORDER_LOCAL_CACHE_MAX_SIZE: int = 10000
+    ORDER_NEGATIVE_CACHE_TTL_SECONDS: int = 10
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_SIZE: int = 10000
+    USER_CACHE_REDIS_TTL_SECONDS: int = 300
+
+    # config for rate limits: "<число>/<second|minute|hour|day>", счётчики общие в redis
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False
+    RATE_LIMIT_REGISTER: str = "5/minute"
+    RATE_LIMIT_LOGIN: str = "5/minute"
+    RATE_LIMIT_ORDER_CREATE: str = "10/minute"
+    RATE_LIMIT_ORDER_BATCH: str = "10/minute"
+    RATE_LIMIT_ORDER_GET: str = "10/minute"
+    RATE_LIMIT_ORDER_PATCH: str = "20/minute"
+    RATE_LIMIT_ORDER_LIST: str = "20/minute"
+    RATE_LIMIT_ORDER_SUMMARY: str = "20/minute"
+    RATE_LIMIT_ORDER_UPDATES: str = "10/minute"
+    RATE_LIMIT_DIAGNOSTICS: str = "10/minute"
+
+    # config for lifespan: прогрев пулов до приёма трафика, проверки готовности и остановка
+    STARTUP_TIMEOUT_SECONDS: float = 30
+    DB_POOL_WARMUP_CONNECTIONS: int = 5
+    REDIS_POOL_WARMUP_CONNECTIONS: int = 5
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2
+    SHUTDOWN_DRAIN_TIMEOUT_SECONDS: float = 10
+
+    # config for order status updates (SSE)
+    ORDER_UPDATES_STREAM_MAXLEN: int = 100000
+    ORDER_UPDATES_QUEUE_SIZE: int = 100
+    ORDER_UPDATES_HEARTBEAT_SECONDS: float = 15
+    ORDER_UPDATES_BACKLOG_MAX: int = 10000
+
+    # config for metrics: отдельный порт /metrics для consumer, worker и outbox relay, 0 - выключено
+    METRICS_PORT: int = 0
+    CONSUMER_QUEUE_DEPTH_INTERVAL_SECONDS: float = 5
+
+    # config for tracing: доля трассируемых запросов (0 - выключено), сохраняются только медленные
+    TRACE_SAMPLE_RATE: float = 0
+    TRACE_SLOW_MS: float = 200
+    TRACE_BUFFER_SIZE: int = 200
+    # файл для выгрузки трассировок (JSON lines), пусто - только кольцевой буфер в памяти
+    TRACE_EXPORT_FILE: str = ""
+    # токен для GET /admin/traces/ (заголовок X-Admin-Token), пусто - endpoint выключен
+    ADMIN_TOKEN: str = ""
+
+    # config for orders
+    ORDER_BATCH_MAX_SIZE: int = 500
+    ORDER_PAGE_MAX_SIZE: int = 200
+    ORDER_STREAM_CHUNK_SIZE: int = 500
+    ORDER_SUMMARY_CACHE_TTL_SECONDS: int = 3600
+    ORDER_SUMMARY_DEFAULT_DAYS: int = 30
+    ORDER_SUMMARY_MAX_DAYS: int = 366
+
+    # config for orders partitions and archive (app/order_maintenance.py)
+    ORDERS_PARTITIONS_AHEAD_MONTHS: int = 3
+    # закрытые заказы старше N дней с последнего изменения уходят в orders_archive, 0 - выключено
+    ORDERS_ARCHIVE_AFTER_DAYS: int = 90
+    ORDERS_ARCHIVE_BATCH_SIZE: int = 1000
+    # секции старше N месяцев переносятся в архив и отсоединяются, 0 - выключено
+    ORDERS_PARTITION_RETENTION_MONTHS: int = 0
+    ORDERS_MAINTENANCE_INTERVAL_SECONDS: int = 3600
 
     # config for RabbitMQ
     RABBIT_URL: str
     NEW_ORDER_QUEUE: str
+    RABBIT_CHANNEL_POOL_SIZE: int = 4
+    # формат тела события: json или binary (16 байт UUID)
+    ORDER_EVENT_FORMAT: Literal["json", "binary"] = "json"
+
+    # config for consumer
+    CONSUMER_PREFETCH_COUNT: int = 200
+    CONSUMER_CONCURRENCY: int = 8
+    CONSUMER_BATCH_SIZE: int = 50
+    CONSUMER_DRAIN_TIMEOUT_SECONDS: float = 30
+
+    # config for worker
+    ORDER_PROCESSED_KEY_TTL_SECONDS: int = 86400
+    # ключ идемпотентности до commit: через сколько заказ упавшего воркера можно обработать повторно
+    ORDER_CLAIM_TTL_SECONDS: int = 60
+
+    # config for outbox relay
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 0.5
+    # отправленные события старше N дней удаляет app/order_maintenance.py, 0 - выключено
+    OUTBOX_RETENTION_DAYS: int = 7
+    OUTBOX_PURGE_BATCH_SIZE: int = 1000
 
 settings = Settings()
@@ -0,0 +1,143 @@
+import logging
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+
+logger = logging.getLogger("metrics")
+
+# бакеты под быстрые операции (redis, запросы по индексу) и медленные (bcrypt, пачки)
+_FAST = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+_SLOW = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса",
+    ["method", "route", "status"], buckets=_SLOW,
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Время выполнения SQL-запроса", ["db"], buckets=_FAST,
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds", "Ожидание соединения из пула", ["db"], buckets=_FAST,
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Обращения к кешу по результату", ["cache", "result"],
+)
+CACHE_REDIS_SECONDS = Histogram(
+    "cache_redis_duration_seconds", "Время обращения к redis из кеша", ["cache", "op"], buckets=_FAST,
+)
+CACHE_LOAD_SECONDS = Histogram(
+    "cache_load_duration_seconds", "Загрузка из БД при промахе кеша", ["cache"], buckets=_FAST,
+)
+
+RABBIT_PUBLISH_SECONDS = Histogram(
+    "rabbit_publish_duration_seconds", "Публикация пачки событий с ожиданием confirms", buckets=_SLOW,
+)
+RABBIT_PUBLISHED = Counter("rabbit_published_total", "Опубликовано событий")
+
+CONSUMER_MESSAGES = Counter(
+    "consumer_messages_total", "Сообщения consumer по результату", ["result"],
+)
+CONSUMER_DISPATCH_SECONDS = Histogram(
+    "consumer_dispatch_duration_seconds", "Постановка пачки в TaskIQ", buckets=_FAST,
+)
+CONSUMER_BATCH_SIZE = Histogram(
+    "consumer_batch_size", "Размер пачки заказов для TaskIQ", buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+)
+CONSUMER_IN_FLIGHT = Gauge("consumer_in_flight_messages", "Полученные и ещё не подтверждённые сообщения")
+CONSUMER_QUEUE_DEPTH = Gauge("consumer_queue_depth", "Сообщений в очереди rabbitmq (отставание consumer)")
+
+ORDER_UPDATES_SUBSCRIBERS = Gauge("order_updates_subscribers", "Открытые SSE-подключения к обновлениям заказов")
+
+TASK_SECONDS = Histogram(
+    "taskiq_task_duration_seconds", "Время выполнения задачи TaskIQ", ["task", "status"], buckets=_SLOW,
+)
+ORDERS_PROCESSED = Counter(
+    "orders_processed_total", "Заказы, обработанные worker, по результату", ["result"],
+)
+
+
+class timed:
+    """Замер блока кода в уже привязанную к меткам гистограмму: with timed(HIST.labels(...))."""
+
+    __slots__ = ("_metric", "_started")
+
+    def __init__(self, metric) -> None:
+        self._metric = metric
+
+    def __enter__(self) -> "timed":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._metric.observe(time.perf_counter() - self._started)
+
+
+def _registry() -> CollectorRegistry:
+    # несколько процессов (воркеры taskiq) пишут метрики в общий каталог
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int) -> None:
+    # отдельный порт для процессов без HTTP (consumer, worker, outbox relay)
+    if not port:
+        return
+    try:
+        start_http_server(port, registry=_registry())
+    except OSError:
+        # порт уже занят соседним процессом того же сервиса, он отдаёт общие метрики
+        logger.info("Порт метрик %s уже занят, сервер метрик не запущен", port)
+        return
+    logger.info("Метрики доступны на порту %s", port)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: время ответа по шаблону маршрута и коду статуса."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # шаблон пути, а не сам путь: иначе каждый order_id станет отдельной серией
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, status_code).observe(
+                time.perf_counter() - started
+            )
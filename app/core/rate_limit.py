@@ -1,7 +1,147 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import functools
+import logging
+from typing import Any, Callable
 
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["100/minute"],
-)
\ No newline at end of file
+from fastapi import Request
+from redis.asyncio.client import Pipeline
+from redis.exceptions import NoScriptError, RedisError
+
+from app.core.config import settings
+from app.core.redis import redis_client
+
+
+logger = logging.getLogger("rate_limit")
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# скользящее окно на двух счётчиках: текущее окно целиком плюс доля предыдущего.
+# время берём у redis, чтобы часы реплик API не влияли на подсчёт.
+# возвращает {1, остаток} или {0, через сколько мс повторить}
+_SLIDING_WINDOW = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local current = math.floor(now / window)
+local elapsed = now % window
+
+local counts = redis.call('HMGET', KEYS[1], current, current - 1)
+local cur = tonumber(counts[1]) or 0
+local prev = tonumber(counts[2]) or 0
+local weighted = prev * (window - elapsed) / window + cur
+
+if weighted + 1 > limit then
+    local retry
+    if cur + 1 > limit then
+        retry = window - elapsed
+    else
+        retry = math.ceil(window - window * (limit - cur - 1) / prev - elapsed)
+    end
+    return {0, math.max(retry, 1)}
+end
+
+redis.call('HINCRBY', KEYS[1], current, 1)
+redis.call('HDEL', KEYS[1], current - 2)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {1, math.floor(limit - weighted - 1)}
+"""
+
+_sliding_window = redis_client.register_script(_SLIDING_WINDOW)
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, rate: str, retry_after_ms: int) -> None:
+        super().__init__(rate)
+        self.rate = rate
+        self.retry_after_ms = retry_after_ms
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate: str) -> tuple[int, int]:
+    # "10/minute", "100/hour", "5/10 seconds" -> (лимит, окно в мс)
+    count, _, period = rate.partition("/")
+    amount, _, unit = period.strip().rpartition(" ")
+    unit = unit.rstrip("s")
+    if unit not in _PERIODS:
+        raise ValueError(f"Неверный формат лимита: {rate}")
+    return int(count), int(amount or 1) * _PERIODS[unit] * 1000
+
+
+def client_identity(request: Request) -> str:
+    # авторизованных считаем по пользователю, остальных - по IP
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is not None:
+        return f"u:{user_id}"
+
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class RateLimitCheck:
+    """Одна проверка лимита: отдельным вызовом или командой в чужом pipeline."""
+
+    def __init__(self, request: Request, scope: str, rate: str) -> None:
+        self.rate = rate
+        self.key = f"rl:{scope}:{client_identity(request)}"
+        self.limit, self.window_ms = parse_rate(rate)
+
+    def queue(self, pipe: Pipeline) -> None:
+        # сразу EVALSHA: pipe.scripts.add() добавил бы SCRIPT EXISTS - лишний round trip на каждый вызов
+        pipe.evalsha(_sliding_window.sha, 1, self.key, self.limit, self.window_ms)
+
+    async def apply(self, result: Any) -> None:
+        # результат из pipeline, выполненного с raise_on_error=False
+        if isinstance(result, NoScriptError):
+            # скрипт ещё не загружен (redis перезапущен) - отдельный вызов загрузит его
+            await self.run()
+            return
+        if isinstance(result, RedisError):
+            logger.warning("Redis недоступен, лимит %s не проверен", self.key)
+            return
+        self._check(result)
+
+    def _check(self, result: Any) -> None:
+        allowed, value = result
+        if not int(allowed):
+            raise RateLimitExceeded(self.rate, int(value))
+
+    async def run(self) -> None:
+        try:
+            result = await _sliding_window(keys=[self.key], args=[self.limit, self.window_ms])
+        except RedisError:
+            # без redis лимиты не считаем, но и запросы не роняем
+            logger.warning("Redis недоступен, лимит %s не проверен", self.key)
+            return
+        self._check(result)
+
+
+class RateLimiter:
+    def limit(self, rate: str, pipelined: bool = False) -> Callable:
+        """Декоратор обработчика с параметром request.
+
+        pipelined=True - обработчик сам вызывает limiter.check(...) и, например,
+        отправляет проверку в redis одним pipeline с чтением кеша.
+        """
+        parse_rate(rate)
+
+        def decorator(func: Callable) -> Callable:
+            if pipelined:
+                return func
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                await self.check(kwargs["request"], func.__name__, rate).run()
+                return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def check(self, request: Request, scope: str, rate: str) -> RateLimitCheck:
+        return RateLimitCheck(request, scope, rate)
+
+
+limiter = RateLimiter()
@@ -1,4 +1,40 @@
-from redis.asyncio import Redis 
+import asyncio
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
 from app.core.config import settings
+from app.core.tracing import span
+
+
+class TracedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        with span("redis.pipeline", commands=len(self.command_stack)):
+            return await super().execute(raise_on_error)
+
+
+class TracedRedis(Redis):
+    # каждая команда - span в текущей трассировке; без трассировки - одна проверка contextvar
+    async def execute_command(self, *args, **options):
+        with span("redis", command=args[0]):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> TracedPipeline:
+        return TracedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+redis_client = TracedRedis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# для готовых JSON-байтов (кеш заказов): без декодирования в str и обратно
+redis_binary_client = TracedRedis.from_url(settings.REDIS_URL, decode_responses=False)
+
+
+async def warm_redis_pools(connections: int) -> None:
+    # одновременные PING открывают сразу несколько соединений в пуле каждого клиента
+    await asyncio.gather(*(
+        client.ping() for client in (redis_client, redis_binary_client) for _ in range(max(1, connections))
+    ))
+
 
-redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
\ No newline at end of file
+async def close_redis_pools() -> None:
+    await asyncio.gather(redis_client.aclose(), redis_binary_client.aclose())
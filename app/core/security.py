@@ -1,10 +1,14 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# при смене BCRYPT_ROUNDS старые хеши считаются устаревшими и перехешируются при входе
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def do_hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -13,8 +17,58 @@ def verify_password(password: str, hashed_password: str) -> bool:
     return pwd_context.verify(password, hashed_password)
 
 
-def create_access_token(user_id: int) -> str:
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """bcrypt в отдельном пуле потоков, чтобы не блокировать event loop.
+
+    Очередь ограничена: при max_pending ожидающих задач новые
+    запросы сразу получают PasswordHasherBusy (ответ 503).
+    Пул создаётся при первом использовании и заново после shutdown:
+    объект модульный и переживает перезапуск lifespan в том же процессе.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self._workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._max_pending = max_pending
+        self._pending = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self._max_pending:
+            raise PasswordHasherBusy()
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        # второй элемент - новый хеш, если параметры хеширования изменились
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+
+def create_access_token(user_id: int, email: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    payload = {"sub": str(user_id), "exp": expire}
+    payload = {"sub": str(user_id), "email": email, "exp": expire}
 
-    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
\ No newline at end of file
+    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
@@ -0,0 +1,177 @@
+import functools
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Any, Callable
+
+import orjson
+
+from app.core.config import settings
+
+
+logger = logging.getLogger("tracing")
+
+# заголовок с id трассировки: ответ API, сообщения rabbitmq
+TRACE_ID_HEADER = "x-trace-id"
+
+_current: ContextVar["Span | None"] = ContextVar("trace_span", default=None)
+_recent: deque[dict] = deque(maxlen=settings.TRACE_BUFFER_SIZE)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "attrs", "children", "start", "end")
+
+    def __init__(self, name: str, trace_id: str, attrs: dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.attrs = attrs
+        self.children: list[Span] = []
+        self.start = time.perf_counter()
+        self.end: float | None = None
+
+    def finish(self) -> None:
+        self.end = time.perf_counter()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def to_dict(self, origin: float) -> dict:
+        return {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            **({"attrs": self.attrs} if self.attrs else {}),
+            **({"children": [child.to_dict(origin) for child in self.children]} if self.children else {}),
+        }
+
+
+class _NoopSpan:
+    # без активной трассировки span() ничего не создаёт
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class _SpanContext:
+    __slots__ = ("_span", "_token")
+
+    def __init__(self, span: Span) -> None:
+        self._span = span
+
+    def __enter__(self) -> Span:
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, *exc) -> None:
+        self._span.finish()
+        _current.reset(self._token)
+
+
+def new_trace_id() -> str:
+    return os.urandom(8).hex()
+
+
+def current_trace_id() -> str | None:
+    current = _current.get()
+    return current.trace_id if current is not None else None
+
+
+def child_span(name: str, **attrs: Any) -> Span | None:
+    # дочерний span без смены текущего: для событий sqlalchemy, закрывается вручную через finish()
+    parent = _current.get()
+    if parent is None:
+        return None
+    child = Span(name, parent.trace_id, attrs)
+    parent.children.append(child)
+    return child
+
+
+def span(name: str, **attrs: Any):
+    """with span("redis", command="GET"): ... - вложенный участок текущей трассировки."""
+    child = child_span(name, **attrs)
+    if child is None:
+        return _NOOP
+    return _SpanContext(child)
+
+
+def traced(name: str) -> Callable:
+    # декоратор для async-функций, сигнатура сохраняется (важно для зависимостей FastAPI)
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_trace(name: str, trace_id: str | None = None, **attrs: Any) -> tuple[Span, Token]:
+    root = Span(name, trace_id or new_trace_id(), attrs)
+    return root, _current.set(root)
+
+
+def finish_trace(root: Span, token: Token, keep: bool = False) -> None:
+    root.finish()
+    _current.reset(token)
+
+    # сохраняем только медленные трассировки (или явно запрошенные)
+    if not keep and root.duration_ms < settings.TRACE_SLOW_MS:
+        return
+
+    record = {"trace_id": root.trace_id, "ts": time.time(), **root.to_dict(root.start)}
+    _recent.append(record)
+    if settings.TRACE_EXPORT_FILE:
+        try:
+            with open(settings.TRACE_EXPORT_FILE, "ab") as f:
+                f.write(orjson.dumps(record) + b"\n")
+        except OSError:
+            logger.warning("Не удалось записать трассировку в %s", settings.TRACE_EXPORT_FILE)
+
+
+def recent_traces(limit: int) -> list[dict]:
+    return list(_recent)[-limit:][::-1]
+
+
+def is_sampled() -> bool:
+    rate = settings.TRACE_SAMPLE_RATE
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+class TracingMiddleware:
+    """ASGI middleware: трассирует долю запросов TRACE_SAMPLE_RATE, медленные сохраняет."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not is_sampled():
+            await self.app(scope, receive, send)
+            return
+
+        root, token = start_trace(f'{scope["method"]} {scope["path"]}')
+        trace_header = (TRACE_ID_HEADER.encode(), root.trace_id.encode())
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), trace_header]
+                root.attrs["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                root.attrs["route"] = route
+            finish_trace(root, token)
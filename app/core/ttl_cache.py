@@ -0,0 +1,52 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Ограниченный по размеру in-process LRU-кеш с TTL на запись.
+
+    Не потокобезопасен - рассчитан на использование из одного event loop.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
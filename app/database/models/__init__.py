@@ -1,5 +1,7 @@
 from app.database.models.user_model import UserModel
 from app.database.models.order_model import OrderModel
+from app.database.models.order_archive_model import OrderArchiveModel
+from app.database.models.outbox_model import OrderOutboxModel
 
 # автогенерейт, чтение метаданных | иначе миграция пустая
-__all__ = ["UserModel", "OrderModel"]
\ No newline at end of file
+__all__ = ["UserModel", "OrderModel", "OrderArchiveModel", "OrderOutboxModel"]
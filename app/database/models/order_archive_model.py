@@ -0,0 +1,32 @@
+import uuid
+from decimal import Decimal
+from sqlalchemy import ForeignKey, DateTime, Index, Integer, func, Numeric, Enum
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database.database import Base
+from app.database.models.order_model import OrderStatus
+
+
+class OrderArchiveModel(Base):
+    """Холодное хранилище: закрытые и старые заказы, перенесённые из orders.
+
+    Колонки совпадают с orders, запись - только job обслуживания.
+    """
+    __tablename__ = "orders_archive"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    items: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    total_price: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
+    status: Mapped[OrderStatus] = mapped_column(Enum(OrderStatus, name="order_status"), nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    archived_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # сводка по статусам и дням учитывает архив
+        Index("ix_orders_archive_user_id_created_at", "user_id", "created_at"),
+        # Last-Modified списка заказов: последний перенос в архив
+        Index("ix_orders_archive_user_id_archived_at", "user_id", "archived_at"),
+    )
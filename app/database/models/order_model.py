@@ -1,6 +1,7 @@
 import enum
 import uuid
-from sqlalchemy import ForeignKey, DateTime, func, Float, Enum
+from decimal import Decimal
+from sqlalchemy import ForeignKey, DateTime, Index, Integer, func, Numeric, Enum, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database.database import Base
@@ -12,15 +13,40 @@ class OrderStatus(str, enum.Enum):
     SHIPPED = "SHIPPED"
     CANCELED = "CANCELED"
 
+# закрытые заказы со временем уходят из горячей таблицы в orders_archive
+CLOSED_STATUSES = (OrderStatus.SHIPPED, OrderStatus.CANCELED)
+
+
 class OrderModel(Base):
     __tablename__ = "orders"
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # колонки {"v", "n", "q", "p"}, см. app/services/order_items.py
     items : Mapped[dict] = mapped_column(JSONB, nullable=False)
-    total_price: Mapped[float] = mapped_column(Float, nullable=False)
+    total_price: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
     status: Mapped[OrderStatus] = mapped_column(
         Enum(OrderStatus, name="order_status"),
         nullable=False,
         default=OrderStatus.PENDING,)
-    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # ключ партиционирования входит в первичный ключ; поиск по id идёт по (id, created_at) каждой секции
+    created_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False)
+    # версия растёт при каждом изменении заказа, из неё строится ETag
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    # секции по месяцам created_at создаёт и отсоединяет app/order_maintenance.py
+    __table_args__ = (
+        # keyset-пагинация заказов пользователя, покрывает и поиск по user_id
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+        # max(updated_at) по пользователю для Last-Modified списка заказов
+        Index("ix_orders_user_id_updated_at", "user_id", "updated_at"),
+        # кандидаты в архив: только закрытые заказы
+        Index(
+            "ix_orders_closed_updated_at", "updated_at",
+            postgresql_where=text("status IN ('SHIPPED', 'CANCELED')"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
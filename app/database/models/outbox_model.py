@@ -0,0 +1,22 @@
+import uuid
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, func, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database.database import Base
+
+
+class OrderOutboxModel(Base):
+    __tablename__ = "order_outbox"
+
+    # в SQLite автоинкремент есть только у INTEGER PRIMARY KEY (бенчмарки, тесты)
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    order_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    event_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    sent_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # relay выбирает только неотправленные события - частичный индекс остаётся маленьким
+    __table_args__ = (
+        Index("ix_order_outbox_pending", "id", postgresql_where=text("sent_at IS NULL")),
+    )
@@ -0,0 +1,117 @@
+import base64
+from datetime import datetime
+from typing import AsyncIterator
+from uuid import UUID
+
+from sqlalchemy import Row, Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models.order_archive_model import OrderArchiveModel
+from app.database.models.order_model import OrderModel, OrderStatus
+
+# read-модель заказов: Core select с явными колонками поверх соединения сессии.
+# строки - неизменяемые Row (tuple) с доступом по атрибутам, без identity map
+# и отслеживания изменений; запись остаётся на ORM
+orders = OrderModel.__table__
+archive = OrderArchiveModel.__table__
+
+ORDER_COLUMNS = (
+    orders.c.id,
+    orders.c.user_id,
+    # orders.c.items - метод ColumnCollection.items(), колонку берём по имени
+    orders.c["items"],
+    orders.c.total_price,
+    orders.c.status,
+    orders.c.created_at,
+    orders.c.version,
+)
+# те же колонки в orders_archive
+ARCHIVE_ORDER_COLUMNS = tuple(archive.c[column.name] for column in ORDER_COLUMNS)
+
+
+def encode_cursor(created_at: datetime, order_id: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{order_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    # ValueError для неверного cursor
+    created_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), UUID(order_id)
+
+
+def user_orders_query(
+    user_id: int,
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    after: tuple[datetime, UUID] | None = None,
+) -> Select:
+    # порядок совпадает с индексом (user_id, created_at, id)
+    query = (
+        select(*ORDER_COLUMNS)
+        .where(orders.c.user_id == user_id)
+        .order_by(orders.c.created_at.desc(), orders.c.id.desc())
+    )
+
+    if status:
+        query = query.where(orders.c.status == OrderStatus(status))
+    if created_from:
+        query = query.where(orders.c.created_at >= created_from)
+    if created_to:
+        query = query.where(orders.c.created_at < created_to)
+    if after:
+        query = query.where(tuple_(orders.c.created_at, orders.c.id) < after)
+
+    return query
+
+
+async def fetch_order(db: AsyncSession, order_id: UUID) -> Row | None:
+    conn = await db.connection()
+    res = await conn.execute(select(*ORDER_COLUMNS).where(orders.c.id == order_id))
+    return res.one_or_none()
+
+
+async def fetch_archived_order(db: AsyncSession, order_id: UUID) -> Row | None:
+    # холодный путь get_order: закрытые и старые заказы, перенесённые из orders
+    conn = await db.connection()
+    res = await conn.execute(select(*ARCHIVE_ORDER_COLUMNS).where(archive.c.id == order_id))
+    return res.one_or_none()
+
+
+async def fetch_order_owner(db: AsyncSession, order_id: UUID) -> Row | None:
+    conn = await db.connection()
+    res = await conn.execute(select(orders.c.user_id, orders.c.status).where(orders.c.id == order_id))
+    return res.one_or_none()
+
+
+async def fetch_last_modified(db: AsyncSession, user_id: int) -> datetime | None:
+    # время последнего изменения любого заказа пользователя: фильтры списка не учитываем,
+    # заказ, ушедший из выборки по статусу, тоже меняет ответ.
+    # перенос в архив убирает заказ из списка, не меняя updated_at, - учитываем archived_at
+    conn = await db.connection()
+    res = await conn.execute(select(
+        select(func.max(orders.c.updated_at)).where(orders.c.user_id == user_id).scalar_subquery(),
+        select(func.max(archive.c.archived_at)).where(archive.c.user_id == user_id).scalar_subquery(),
+    ))
+    return max(filter(None, res.one()), default=None)
+
+
+async def fetch_page(db: AsyncSession, query: Select, limit: int) -> tuple[list[Row], str | None]:
+    # на одну строку больше - чтобы понять, есть ли следующая страница
+    conn = await db.connection()
+    res = await conn.execute(query.limit(limit + 1))
+    rows = res.all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+async def stream_rows(db: AsyncSession, query: Select, chunk_size: int) -> AsyncIterator[Row]:
+    # server-side cursor отдаёт строки порциями, память не растёт с числом заказов
+    conn = await db.connection()
+    result = await conn.stream(query.execution_options(yield_per=chunk_size))
+    async for row in result:
+        yield row
@@ -1,11 +1,230 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import asyncio
+import functools
+import logging
+import time
+import uuid
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from app.core.config import settings
+from app.core.metrics import DB_POOL_WAIT_SECONDS, DB_QUERY_SECONDS
+from app.core.tracing import child_span, span
+
+
+logger = logging.getLogger("database")
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    # считает время ожидания свободного соединения из пула
+    wait_count = 0
+    wait_seconds_total = 0.0
+    wait_seconds_max = 0.0
+    wait_metric = DB_POOL_WAIT_SECONDS.labels("primary")
+
+    def _do_get(self):
+        started = time.perf_counter()
+        trace = child_span("db.pool_wait")
+        try:
+            return super()._do_get()
+        finally:
+            if trace is not None:
+                trace.finish()
+            waited = time.perf_counter() - started
+            self.wait_count += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.wait_metric.observe(waited)
+
+
+@functools.lru_cache(maxsize=None)
+def _pool_class(label: str) -> type[InstrumentedQueuePool]:
+    # метка в классе, а не в экземпляре: пул пересоздаётся через type(self)(...)
+    return type(f"InstrumentedQueuePool[{label}]", (InstrumentedQueuePool,), {
+        "wait_metric": DB_POOL_WAIT_SECONDS.labels(label),
+    })
+
+
+def _instrument(db_engine: AsyncEngine, label: str) -> AsyncEngine:
+    query_seconds = DB_QUERY_SECONDS.labels(label)
+
+    @event.listens_for(db_engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+        conn.info["query_span"] = child_span("sql", db=label, statement=statement[:200])
+
+    @event.listens_for(db_engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        query_seconds.observe(time.perf_counter() - conn.info.pop("query_started"))
+        trace = conn.info.pop("query_span", None)
+        if trace is not None:
+            trace.finish()
+
+    return db_engine
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def _connect_args(url: str) -> dict:
+    if not url.startswith("postgresql+asyncpg"):
+        return {}
+
+    args: dict = {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    if settings.DB_PGBOUNCER_MODE:
+        # pgbouncer в transaction mode не переносит именованные prepared statements между клиентами
+        args["statement_cache_size"] = 0
+        args["prepared_statement_cache_size"] = 0
+        # безымянные запросы asyncpg всё равно готовит под именами __asyncpg_stmt_N__, счётчик
+        # свой у каждого клиента - за pgbouncer имена совпадут на одном серверном соединении
+        args["prepared_statement_name_func"] = _unique_statement_name
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    return args
+
+
+def create_engine_for(url: str, label: str = "primary") -> AsyncEngine:
+    if settings.DB_PGBOUNCER_MODE:
+        # пулом соединений управляет pgbouncer
+        return _instrument(create_async_engine(
+            url,
+            echo=settings.DB_ECHO,
+            poolclass=NullPool,
+            connect_args=_connect_args(url),
+        ), label)
+
+    return _instrument(create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=_pool_class(label),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=_connect_args(url),
+    ), label)
+
 
 # подключение и управление сессией
-engine = create_async_engine(settings.database_url, echo=True)
+engine = create_engine_for(settings.database_url)
 asyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+
+class Replica:
+    """Реплика только для чтения со своим пулом и признаком доступности."""
+
+    def __init__(self, url: str) -> None:
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_engine_for(url, "replica")
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
+        self.healthy = True
+
+
+replicas = [Replica(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+_next_replica = 0
+
+
+def read_sessionmaker() -> async_sessionmaker:
+    # реплики по кругу, недоступные пропускаем; если живых нет - читаем с primary
+    global _next_replica
+    for _ in range(len(replicas)):
+        replica = replicas[_next_replica % len(replicas)]
+        _next_replica += 1
+        if replica.healthy:
+            return replica.sessionmaker
+    return asyncSessionLocal
+
+
+async def _check_replica(replica: Replica) -> None:
+    try:
+        async with replica.engine.connect() as conn:
+            await asyncio.wait_for(
+                conn.execute(text("SELECT 1")),
+                timeout=settings.DB_REPLICA_HEALTH_TIMEOUT_SECONDS,
+            )
+        healthy = True
+    except Exception:
+        healthy = False
+
+    if healthy != replica.healthy:
+        logger.warning("Реплика %s %s", replica.name, "снова доступна" if healthy else "недоступна")
+    replica.healthy = healthy
+
+
+async def run_replica_health_checks() -> None:
+    if not replicas:
+        return
+
+    while True:
+        await asyncio.gather(*(_check_replica(replica) for replica in replicas))
+        await asyncio.sleep(settings.DB_REPLICA_HEALTH_INTERVAL_SECONDS)
+
+
+async def check_database(db_engine: AsyncEngine | None = None) -> None:
+    async with (db_engine or engine).connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def _warm_engine(db_engine: AsyncEngine, connections: int) -> None:
+    # одновременные подключения - разные соединения; после проверки они остаются в пуле
+    await asyncio.gather(*(check_database(db_engine) for _ in range(connections)))
+
+
+async def warm_database_pools(connections: int) -> None:
+    # без собственного пула (pgbouncer) держать нечего - только проверка подключения
+    connections = 1 if settings.DB_PGBOUNCER_MODE else max(1, min(connections, settings.DB_POOL_SIZE))
+    await _warm_engine(engine, connections)
+
+    # недоступная реплика не мешает старту: чтение уйдёт на primary, вернёт её фоновая проверка
+    for replica in replicas:
+        try:
+            await _warm_engine(replica.engine, connections)
+        except Exception:
+            replica.healthy = False
+            logger.warning("Реплика %s недоступна при старте", replica.name)
+
+
+async def dispose_database_pools() -> None:
+    await asyncio.gather(engine.dispose(), *(replica.engine.dispose() for replica in replicas))
+
+
+def _pool_stats(db_engine: AsyncEngine) -> dict:
+    pool = db_engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return {"pool": type(pool).__name__}
+
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "wait_count": pool.wait_count,
+        "wait_seconds_total": round(pool.wait_seconds_total, 6),
+        "wait_seconds_max": round(pool.wait_seconds_max, 6),
+    }
+
+
+def pool_status() -> dict:
+    return {
+        **_pool_stats(engine),
+        "replicas": [
+            {"name": replica.name, "healthy": replica.healthy, **_pool_stats(replica.engine)}
+            for replica in replicas
+        ],
+    }
+
+
 async def get_database():
-    async with asyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+    with span("get_database"):
+        session = asyncSessionLocal()
+    async with session:
+        yield session
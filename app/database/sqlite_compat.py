@@ -0,0 +1,9 @@
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+# схема рассчитана на PostgreSQL; для SQLite (тесты, бенчмарки) JSONB хранится как JSON
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(type_, compiler, **kw) -> str:
+    return "JSON"
@@ -0,0 +1,140 @@
+import asyncio
+import contextlib
+import logging
+import signal
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.core.redis import close_redis_pools, redis_client, warm_redis_pools
+from app.core.security import password_hasher
+from app.database.session import (
+    check_database,
+    dispose_database_pools,
+    run_replica_health_checks,
+    warm_database_pools,
+)
+from app.services.cache_invalidation import run_invalidation_listener
+from app.services.cache_users import wait_pending_invalidations
+from app.services.order_updates import hub
+
+
+logger = logging.getLogger("lifespan")
+
+
+class AppResources:
+    """Общие клиенты процесса API: прогрев до приёма трафика, готовность и остановка.
+
+    Трафик принимается только после прогрева пулов БД и Redis; по SIGTERM процесс
+    перестаёт быть готовым, закрывает SSE-потоки и после завершения запросов
+    закрывает пулы.
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.draining = False
+        self._tasks: list[asyncio.Task] = []
+        self._last_check: tuple[float, dict[str, bool]] = (0.0, {})
+
+    async def start(self) -> None:
+        started = time.perf_counter()
+        await asyncio.wait_for(self._warm_up(), timeout=settings.STARTUP_TIMEOUT_SECONDS)
+
+        self._tasks = [
+            # подписка на инвалидацию локальных кешей от других реплик
+            asyncio.create_task(run_invalidation_listener()),
+            # фоновая проверка доступности реплик для чтения
+            asyncio.create_task(run_replica_health_checks()),
+            # чтение stream обновлений статусов для SSE-подписчиков
+            asyncio.create_task(hub.run()),
+        ]
+        self._chain_sigterm()
+        self.ready = True
+        logger.info("Пулы прогреты за %.0f мс, сервис готов", (time.perf_counter() - started) * 1000)
+
+    async def _warm_up(self) -> None:
+        # зависимости ещё поднимаются (deploy, рестарт compose) - повторяем до STARTUP_TIMEOUT_SECONDS
+        delay = 0.5
+        while True:
+            try:
+                await asyncio.gather(
+                    warm_database_pools(settings.DB_POOL_WARMUP_CONNECTIONS),
+                    warm_redis_pools(settings.REDIS_POOL_WARMUP_CONNECTIONS),
+                )
+                return
+            except Exception as exc:
+                logger.warning("Прогрев не удался (%s), повтор через %.1f с", exc, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5)
+
+    def _chain_sigterm(self) -> None:
+        # uvicorn закрывает lifespan только после завершения открытых соединений,
+        # поэтому SSE-потоки закрываем сразу по сигналу, а обработчик сервера вызываем следом
+        if threading.current_thread() is not threading.main_thread():
+            return
+        previous = signal.getsignal(signal.SIGTERM)
+        if not callable(previous):
+            return
+        loop = asyncio.get_running_loop()
+
+        def handler(signum, frame) -> None:
+            loop.call_soon_threadsafe(self.begin_drain)
+            previous(signum, frame)
+
+        signal.signal(signal.SIGTERM, handler)
+
+    def begin_drain(self) -> None:
+        if self.draining:
+            return
+        self.draining = True
+        self.ready = False
+        hub.close_all()
+        logger.info("Остановка: новые запросы не принимаются, SSE-потоки закрыты")
+
+    async def readiness(self) -> dict[str, bool]:
+        # частые проверки балансировщика не нагружают БД: результат живёт секунду
+        checked_at, checks = self._last_check
+        if time.monotonic() - checked_at < 1:
+            return checks
+
+        async def probe(check) -> bool:
+            try:
+                await asyncio.wait_for(check, timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS)
+                return True
+            except Exception:
+                return False
+
+        database, redis = await asyncio.gather(probe(check_database()), probe(redis_client.ping()))
+        checks = {"database": database, "redis": redis}
+        self._last_check = (time.monotonic(), checks)
+        return checks
+
+    async def stop(self) -> None:
+        self.begin_drain()
+
+        for task in self._tasks:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+        # запросы уже завершены; дожидаемся фоновых сбросов кеша, потом закрываем пулы
+        await wait_pending_invalidations(settings.SHUTDOWN_DRAIN_TIMEOUT_SECONDS)
+        await close_redis_pools()
+        await dispose_database_pools()
+        password_hasher.shutdown()
+        logger.info("Пулы закрыты")
+
+
+resources = AppResources()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await resources.start()
+    try:
+        yield
+    finally:
+        await resources.stop()
@@ -1,14 +1,18 @@
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from app.core.rate_limit import limiter
+from app.core.metrics import MetricsMiddleware
+from app.core.rate_limit import RateLimitExceeded
+from app.core.tracing import TracingMiddleware
+from app.core.security import PasswordHasherBusy
 
 from app.api.routes.auth_route import auth_router
+from app.api.routes.order_updates_route import order_updates_router
 from app.api.routes.orders_route import orders_router
 from app.api.routes.default_route import default_router
+from app.lifespan import lifespan
 
 
 logging.basicConfig(
@@ -17,7 +21,11 @@ logging.basicConfig(
 )
 
 
-app = FastAPI(title="Сервис заказов")
+app = FastAPI(title="Сервис заказов", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+app.add_middleware(MetricsMiddleware)
+# выборочная трассировка запросов, включается TRACE_SAMPLE_RATE > 0
+app.add_middleware(TracingMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,10 +38,27 @@ app.add_middleware(
     allow_credentials=True,
 )
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": f"Превышен лимит запросов: {exc.rate}"},
+        headers={"Retry-After": str(max(1, -(-exc.retry_after_ms // 1000)))},
+    )
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    # пул bcrypt переполнен - быстро отказываем, клиент повторит позже
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Сервис перегружен, повторите позже"},
+        headers={"Retry-After": "1"},
+    )
+
 
 app.include_router(auth_router)
+app.include_router(order_updates_router)
 app.include_router(orders_router)
 app.include_router(default_router)
 
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import signal
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database.session import engine
+from app.services.order_outbox import purge_sent_events
+from app.services.order_partitions import (
+    archive_closed_orders,
+    create_upcoming_partitions,
+    detach_old_partitions,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+)
+logger = logging.getLogger("order_maintenance")
+
+# один экземпляр job за раз: DDL секций и перенос в архив не должны идти параллельно
+_ADVISORY_LOCK_ID = 704215
+
+
+async def run_maintenance() -> None:
+    now = datetime.now(timezone.utc)
+    # advisory lock живёт в соединении: сессия работает на одном соединении, а не на пуле
+    async with engine.connect() as conn:
+        locked = (await conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": _ADVISORY_LOCK_ID})).scalar_one()
+        await conn.commit()
+        if not locked:
+            logger.info("Обслуживание уже выполняет другой экземпляр")
+            return
+
+        try:
+            async with AsyncSession(bind=conn) as db:
+                await _maintain(db, now)
+        finally:
+            await conn.rollback()
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _ADVISORY_LOCK_ID})
+            await conn.commit()
+
+
+async def _maintain(db: AsyncSession, now: datetime) -> None:
+    created = await create_upcoming_partitions(db, settings.ORDERS_PARTITIONS_AHEAD_MONTHS, now)
+    await db.commit()
+    if created:
+        logger.info("Созданы секции orders: %s", ", ".join(created))
+
+    if settings.ORDERS_ARCHIVE_AFTER_DAYS:
+        archived = 0
+        # короткие транзакции по пачке: блокировки строк не держатся долго
+        while True:
+            moved = await archive_closed_orders(
+                db, timedelta(days=settings.ORDERS_ARCHIVE_AFTER_DAYS), settings.ORDERS_ARCHIVE_BATCH_SIZE, now,
+            )
+            await db.commit()
+            archived += moved
+            if moved < settings.ORDERS_ARCHIVE_BATCH_SIZE:
+                break
+        if archived:
+            logger.info("Перенесено закрытых заказов в архив: %s", archived)
+
+    if settings.ORDERS_PARTITION_RETENTION_MONTHS:
+        await detach_old_partitions(db, settings.ORDERS_PARTITION_RETENTION_MONTHS, now)
+
+    if settings.OUTBOX_RETENTION_DAYS:
+        purged = 0
+        while True:
+            deleted = await purge_sent_events(
+                db, timedelta(days=settings.OUTBOX_RETENTION_DAYS), settings.OUTBOX_PURGE_BATCH_SIZE, now,
+            )
+            await db.commit()
+            purged += deleted
+            if deleted < settings.OUTBOX_PURGE_BATCH_SIZE:
+                break
+        if purged:
+            logger.info("Удалено отправленных событий outbox: %s", purged)
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info("Обслуживание orders запущено, интервал %s с", settings.ORDERS_MAINTENANCE_INTERVAL_SECONDS)
+
+    while not stop.is_set():
+        try:
+            await run_maintenance()
+        except Exception:
+            logger.exception("Ошибка обслуживания секций и архива, повтор на следующем цикле")
+
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.ORDERS_MAINTENANCE_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import signal
+
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.core.metrics import start_metrics_server
+from app.database.models.outbox_model import OrderOutboxModel
+from app.database.session import asyncSessionLocal
+from app.services.rabbit_publisher import publish_new_order_events, publisher
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+)
+logger = logging.getLogger("outbox_relay")
+
+
+async def relay_batch(batch_size: int) -> int:
+    # строки блокируются до конца транзакции, SKIP LOCKED позволяет
+    # запускать несколько relay параллельно без двойной отправки
+    async with asyncSessionLocal() as db:
+        async with db.begin():
+            res = await db.execute(
+                select(OrderOutboxModel.id, OrderOutboxModel.order_id, OrderOutboxModel.payload)
+                .where(OrderOutboxModel.sent_at.is_(None))
+                .order_by(OrderOutboxModel.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = res.all()
+            if not rows:
+                return 0
+
+            # если публикация упадёт - транзакция откатится и события уйдут при следующей попытке
+            await publish_new_order_events(
+                [row.order_id for row in rows],
+                [(row.payload or {}).get("trace_id") for row in rows],
+            )
+
+            await db.execute(
+                update(OrderOutboxModel)
+                .where(OrderOutboxModel.id.in_([row.id for row in rows]))
+                .values(sent_at=func.now())
+            )
+
+    return len(rows)
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    start_metrics_server(settings.METRICS_PORT)
+    await publisher.start()
+    logger.info("Outbox relay запущен, batch_size=%s", settings.OUTBOX_BATCH_SIZE)
+
+    try:
+        while not stop.is_set():
+            try:
+                sent = await relay_batch(settings.OUTBOX_BATCH_SIZE)
+            except Exception:
+                logger.exception("Ошибка отправки outbox, повтор")
+                sent = 0
+
+            if sent:
+                logger.info("Отправлено событий из outbox: %s", sent)
+
+            # полная пачка - в очереди, скорее всего, есть ещё; сразу берём следующую
+            if sent < settings.OUTBOX_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=settings.OUTBOX_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        await publisher.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,31 +1,91 @@
-﻿from uuid import UUID
-from typing import Literal
+﻿import math
+from decimal import Decimal, DecimalException
+from uuid import UUID
+from typing import Annotated, Any, Literal
 
-from pydantic import BaseModel, Field, model_validator
+from typing_extensions import TypedDict
+
+from pydantic import BaseModel, Field, PlainValidator, model_validator
+
+from app.core.config import settings
 
 order_status = Literal["PENDING", "PAID", "CANCELED", "SHIPPED"]
 
 
-class OrderItem(BaseModel):
+# деньги - Decimal с двумя знаками: в БД Numeric(12, 2), в items - целые копейки
+Money = Annotated[Decimal, Field(gt=0, max_digits=12, decimal_places=2)]
+# верхняя граница Numeric(12, 2) в копейках
+MAX_CENTS_DIGITS = 12
+MAX_CENTS = 10 ** MAX_CENTS_DIGITS
+
+
+def to_cents(amount: Decimal) -> int:
+    # валидатор Money гарантирует не больше двух знаков, перевод в копейки точный
+    return int(amount.scaleb(2))
+
+
+def price_to_cents(value: Any) -> int:
+    # цена позиции сразу в целые копейки: Decimal на каждую из сотен позиций - основная цена валидации.
+    # число из JSON приходит как float: в пределах Numeric(12, 2) округление до копеек точное,
+    # а третий знак после запятой даёт отклонение не меньше 0.1 копейки
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError("Цена должна быть числом")
+        cents = round(value * 100)
+        exact = abs(value * 100 - cents) < 1e-3
+    elif isinstance(value, (int, str, Decimal)) and not isinstance(value, bool):
+        try:
+            amount = Decimal(value).scaleb(2)
+        except DecimalException:
+            # InvalidOperation для "abc", Overflow для "1e1000000"
+            raise ValueError("Цена должна быть числом")
+        if not amount.is_finite():
+            raise ValueError("Цена должна быть числом")
+        # порядок проверяем до int(): "1e999990" иначе развернулся бы в число из миллиона цифр
+        if amount.adjusted() >= MAX_CENTS_DIGITS:
+            raise ValueError("Цена должна быть больше 0 и меньше 10^10")
+        exact = amount == amount.to_integral_value()
+        cents = int(amount) if exact else 0
+    else:
+        raise ValueError("Цена должна быть числом")
+
+    if not exact:
+        raise ValueError("Цена должна иметь не больше двух знаков после запятой")
+    if not 0 < cents < MAX_CENTS:
+        raise ValueError("Цена должна быть больше 0 и меньше 10^10")
+    return cents
+
+
+class OrderItem(TypedDict):
+    # TypedDict, а не модель: в заказе сотни позиций, объект на каждую заметно дороже валидации
     name_product: str
-    count_product: int = Field(gt=0)
-    price_product: float = Field(gt=0)
+    count_product: Annotated[int, Field(gt=0)]
+    # на входе рубли (число или строка), после валидации - целые копейки
+    price_product: Annotated[int, PlainValidator(price_to_cents, json_schema_input_type=Decimal)]
 
 
 class OrderCreateIn(BaseModel):
     items: list[OrderItem] = Field(min_length=1)
-    total_price: float = Field(gt=0)
+    total_price: Money
 
     @model_validator(mode="after")
     def validate_total_price(self):
-        calculated_total = sum(item.count_product * item.price_product for item in self.items)
-        if abs(calculated_total - self.total_price) > 1e-6:
+        # один проход по позициям, точная сумма в целых копейках
+        calculated_total = sum(item["count_product"] * item["price_product"] for item in self.items)
+        if calculated_total != to_cents(self.total_price):
             raise ValueError("Итоговая цена не соответствует сумме товаров")
         return self
 
 
+class OrderBatchCreateIn(BaseModel):
+    # каждый заказ валидируется отдельно, чтобы вернуть результат по каждой позиции
+    orders: list[dict[str, Any]] = Field(min_length=1, max_length=settings.ORDER_BATCH_MAX_SIZE)
+
+
 class OrderPatchIn(BaseModel):
     status: order_status
+    # optimistic concurrency: обновить, только если текущий статус совпадает
+    expected_status: order_status | None = None
 
 
 class OrderOut(BaseModel):
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Iterable
+
+from redis.asyncio.client import Pipeline
+
+from app.core.redis import redis_client
+from app.core.ttl_cache import TTLCache
+
+
+logger = logging.getLogger("cache")
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# свои же сообщения слушатель пропускает
+INSTANCE_ID = uuid.uuid4().hex
+
+_local_caches: dict[str, TTLCache] = {}
+
+
+def register_local_cache(name: str, cache: TTLCache) -> None:
+    _local_caches[name] = cache
+
+
+def publish_invalidation(pipe: Pipeline, cache: str, keys: Iterable[str | int]) -> None:
+    # команда ставится в уже открытый pipeline и уходит тем же round trip
+    pipe.publish(
+        INVALIDATION_CHANNEL,
+        json.dumps({"src": INSTANCE_ID, "cache": cache, "keys": list(keys)}),
+    )
+
+
+async def run_invalidation_listener() -> None:
+    # сбрасывает локальные копии, изменённые другими репликами API
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+
+            # пока не были подписаны, сообщения могли потеряться
+            for cache in _local_caches.values():
+                cache.clear()
+
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+
+                data = json.loads(message["data"])
+                if data["src"] == INSTANCE_ID:
+                    continue
+
+                cache = _local_caches.get(data["cache"])
+                if cache is not None:
+                    for key in data["keys"]:
+                        cache.pop(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Потеряна подписка на инвалидацию кеша, переподключение")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
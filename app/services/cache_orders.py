@@ -1,22 +1,189 @@
-import json
+import asyncio
 from uuid import UUID
-from typing import Union
+from typing import Any, Awaitable, Callable, NamedTuple, Protocol, Union
+
+from redis.asyncio.client import Pipeline
+
 from app.core.config import settings
-from app.core.redis import redis_client
+from app.core.metrics import CACHE_LOAD_SECONDS, CACHE_REDIS_SECONDS, CACHE_REQUESTS, timed
+from app.core.redis import redis_binary_client
+from app.core.ttl_cache import TTLCache
+from app.services.cache_invalidation import publish_invalidation, register_local_cache
+
+
+class CachedOrder(NamedTuple):
+    # body - готовый JSON ответа, отдаётся клиенту без разбора и повторной сериализации
+    order_id: str
+    user_id: int
+    version: int
+    body: bytes
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+
+# метка "заказа нет" - короткоживущий negative cache для 404
+_NEGATIVE = b"__none__"
+_MISSING = object()
+
+_local = TTLCache(settings.ORDER_LOCAL_CACHE_MAX_SIZE, settings.ORDER_LOCAL_CACHE_TTL_SECONDS)
+register_local_cache("order", _local)
+
+# single-flight: одновременные промахи по одному заказу ждут одну загрузку
+_inflight: dict[str, asyncio.Future] = {}
+
+_stats = {
+    "redis_hits": 0,
+    "negative_hits": 0,
+    "db_loads": 0,
+    "coalesced": 0,
+}
+
+# дочерние метрики привязаны к меткам заранее, на горячем пути только inc/observe
+_requests = {result: CACHE_REQUESTS.labels("order", result) for result in ("local_hit", *_stats)}
+_redis_get_seconds = CACHE_REDIS_SECONDS.labels("order", "get")
+_load_seconds = CACHE_LOAD_SECONDS.labels("order")
+
+def _count(result: str) -> None:
+    _stats[result] += 1
+    _requests[result].inc()
 
 def _key(order_id: Union[str, UUID]) -> str:
     return f"order:{str(order_id)}"
 
-async def get_cached_order(order_id: Union[str, UUID]) -> dict | None:
-    raw = await redis_client.get(_key(order_id))
-    return json.loads(raw) if raw else None
+# в redis лежит "<user_id>:<version>\n<json>": владельца и ETag можно проверить, не разбирая JSON
+def _dump(entry: CachedOrder) -> bytes:
+    return b"%d:%d\n%b" % (entry.user_id, entry.version, entry.body)
+
+def _load(order_id: str, raw: bytes) -> CachedOrder | None:
+    header, sep, body = raw.partition(b"\n")
+    user_id, colon, version = header.partition(b":")
+    if not sep or not colon or not user_id.isdigit() or not version.isdigit():
+        # запись в старом формате - считаем промахом и перезаписываем
+        return None
+    return CachedOrder(order_id, int(user_id), int(version), body)
+
+def get_cache_stats() -> dict:
+    return {
+        "local_hits": _local.hits,
+        "local_misses": _local.misses,
+        "local_evictions": _local.evictions,
+        "local_size": len(_local),
+        **_stats,
+    }
+
+class Piggyback(Protocol):
+    # сторонняя команда, которую можно отправить в redis вместе с чтением кеша
+    def queue(self, pipe: Pipeline) -> None: ...
+    async def apply(self, result: Any) -> None: ...
+    async def run(self) -> None: ...
+
+async def get_order_cached(
+    order_id: Union[str, UUID],
+    loader: Callable[[], Awaitable[CachedOrder | None]],
+    piggyback: Piggyback | None = None,
+) -> CachedOrder | None:
+    # память процесса -> redis -> loader (БД); None - заказа не существует
+    order_id = str(order_id)
+
+    cached = _local.get(order_id, _MISSING)
+    if cached is not _MISSING:
+        if piggyback is not None:
+            await piggyback.run()
+        if cached is _NEGATIVE:
+            _count("negative_hits")
+            return None
+        _requests["local_hit"].inc()
+        return cached
+
+    inflight = _inflight.get(order_id)
+    if inflight is None:
+        entry = _from_redis(order_id, await _redis_get(order_id, piggyback))
+        if entry is not _MISSING:
+            return entry
+
+        # пока ждали redis, загрузку из БД мог начать другой запрос
+        inflight = _inflight.get(order_id)
+        if inflight is None:
+            return await _load_single_flight(order_id, loader)
+    elif piggyback is not None:
+        await piggyback.run()
+
+    _count("coalesced")
+    return await asyncio.shield(inflight)
+
+async def _redis_get(order_id: str, piggyback: Piggyback | None) -> bytes | None:
+    with timed(_redis_get_seconds):
+        if piggyback is None:
+            return await redis_binary_client.get(_key(order_id))
+
+        # GET и сторонняя команда - один round trip
+        # ошибка сторонней команды не должна ронять чтение кеша - разбирает её сам piggyback
+        async with redis_binary_client.pipeline(transaction=False) as pipe:
+            pipe.get(_key(order_id))
+            piggyback.queue(pipe)
+            raw, result = await pipe.execute(raise_on_error=False)
+    if isinstance(raw, Exception):
+        raise raw
+    await piggyback.apply(result)
+    return raw
+
+def _from_redis(order_id: str, raw: bytes | None) -> CachedOrder | None | object:
+    if raw == _NEGATIVE:
+        _count("negative_hits")
+        _local.set(order_id, _NEGATIVE, ttl=settings.ORDER_NEGATIVE_CACHE_TTL_SECONDS)
+        return None
+    entry = _load(order_id, raw) if raw else None
+    if entry is None:
+        return _MISSING
+
+    _count("redis_hits")
+    _local.set(order_id, entry)
+    return entry
+
+async def _load_single_flight(order_id: str, loader: Callable[[], Awaitable[CachedOrder | None]]) -> CachedOrder | None:
+    future = asyncio.get_running_loop().create_future()
+    _inflight[order_id] = future
+    try:
+        entry = await _load_order(order_id, loader)
+    except BaseException as e:
+        future.set_exception(e)
+        # помечаем исключение полученным, даже если ждущих не было
+        future.exception()
+        raise
+    else:
+        future.set_result(entry)
+        return entry
+    finally:
+        _inflight.pop(order_id, None)
+
+async def _load_order(order_id: str, loader: Callable[[], Awaitable[CachedOrder | None]]) -> CachedOrder | None:
+    _count("db_loads")
+    with timed(_load_seconds):
+        entry = await loader()
+
+    if entry is None:
+        await redis_binary_client.setex(_key(order_id), settings.ORDER_NEGATIVE_CACHE_TTL_SECONDS, _NEGATIVE)
+        _local.set(order_id, _NEGATIVE, ttl=settings.ORDER_NEGATIVE_CACHE_TTL_SECONDS)
+        return None
+
+    _local.set(order_id, entry)
+    await redis_binary_client.setex(_key(order_id), settings.ORDER_CACHE_EXPIRE_SECONDS, _dump(entry))
+    return entry
 
-async def set_cached_order(order_id: Union[str, UUID], data: dict) -> None:
-    await redis_client.setex(
-        _key(order_id),
-        settings.ORDER_CACHE_EXPIRE_SECONDS,
-        json.dumps(data, default=str),
-    )
+def queue_cached_orders(pipe: Pipeline, entries: list[CachedOrder], invalidate: bool) -> None:
+    # запись в кеш командами в чужом pipeline: уходит тем же round trip, что и остальное после записи.
+    # для новых заказов локальных копий на других репликах нет, инвалидация не нужна
+    for entry in entries:
+        _local.set(entry.order_id, entry)
+        pipe.setex(_key(entry.order_id), settings.ORDER_CACHE_EXPIRE_SECONDS, _dump(entry))
+    if invalidate and entries:
+        publish_invalidation(pipe, "order", [entry.order_id for entry in entries])
 
 async def delete_cached_order(order_id: Union[str, UUID]) -> None:
-    await redis_client.delete(_key(order_id))
\ No newline at end of file
+    _local.pop(str(order_id))
+    async with redis_binary_client.pipeline(transaction=False) as pipe:
+        pipe.delete(_key(order_id))
+        publish_invalidation(pipe, "order", [str(order_id)])
+        await pipe.execute()
@@ -0,0 +1,90 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.core.ttl_cache import TTLCache
+from app.database.models.user_model import UserModel
+from app.services.cache_invalidation import publish_invalidation, register_local_cache
+
+
+@dataclass(frozen=True, slots=True)
+class UserPrincipal:
+    # всё, что нужно обработчикам о текущем пользователе, без ORM-объекта
+    id: int
+    email: str
+
+
+# первый уровень - память процесса, второй - redis
+_local = TTLCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+register_local_cache("user", _local)
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+async def get_cached_user(user_id: int) -> UserPrincipal | None:
+    user = _local.get(user_id)
+    if user is not None:
+        return user
+
+    raw = await redis_client.get(_key(user_id))
+    if not raw:
+        return None
+
+    user = UserPrincipal(**json.loads(raw))
+    _local.set(user_id, user)
+    return user
+
+
+async def set_cached_user(user: UserPrincipal) -> None:
+    _local.set(user.id, user)
+    await redis_client.setex(
+        _key(user.id),
+        settings.USER_CACHE_REDIS_TTL_SECONDS,
+        json.dumps({"id": user.id, "email": user.email}),
+    )
+
+
+async def invalidate_cached_users(user_ids: Iterable[int]) -> None:
+    user_ids = list(user_ids)
+    for user_id in user_ids:
+        _local.pop(user_id)
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.delete(*(_key(user_id) for user_id in user_ids))
+        publish_invalidation(pipe, "user", user_ids)
+        await pipe.execute()
+
+
+# сброс кеша при любом изменении пользователя через ORM - после успешного commit
+@event.listens_for(UserModel, "after_update")
+@event.listens_for(UserModel, "after_delete")
+def _mark_user_changed(mapper, connection, target: UserModel) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    user_ids = session.info.pop("changed_user_ids", None)
+    if not user_ids:
+        return
+
+    task = asyncio.get_running_loop().create_task(invalidate_cached_users(user_ids))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def wait_pending_invalidations(timeout: float) -> None:
+    # остановка процесса: сбросы кеша после commit не должны потеряться
+    if _background_tasks:
+        await asyncio.wait(set(_background_tasks), timeout=timeout)
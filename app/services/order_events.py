@@ -0,0 +1,77 @@
+import json
+import struct
+from typing import Callable, NamedTuple, Optional
+from uuid import UUID
+
+# формат сообщения определяется заголовком content-type, без угадывания по телу
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_BINARY = "application/x-order-event"
+
+ENVELOPE_VERSION = 1
+ENVELOPE_VERSION_HEADER = "x-envelope-version"
+
+# бинарный формат: версия (1 байт), тип события (1 байт), 16 байт UUID
+_BINARY = struct.Struct("!BB16s")
+
+_EVENT_CODES = {"new_order": 1}
+_EVENT_NAMES = {code: name for name, code in _EVENT_CODES.items()}
+
+
+class OrderEvent(NamedTuple):
+    event_type: str
+    order_id: UUID
+
+
+def _encode_json(event: OrderEvent) -> bytes:
+    # тело совпадает с прежним форматом {"order_id": "..."}, тип события - только если не new_order
+    payload = {"order_id": str(event.order_id)}
+    if event.event_type != "new_order":
+        payload["event"] = event.event_type
+    return json.dumps(payload).encode()
+
+
+def _decode_json(body: bytes) -> OrderEvent:
+    payload = json.loads(body)
+    # v0: самые первые продюсеры публиковали голую строку "<uuid>"
+    if isinstance(payload, str):
+        return OrderEvent("new_order", UUID(payload))
+    return OrderEvent(payload.get("event", "new_order"), UUID(payload["order_id"]))
+
+
+def _encode_binary(event: OrderEvent) -> bytes:
+    return _BINARY.pack(ENVELOPE_VERSION, _EVENT_CODES[event.event_type], event.order_id.bytes)
+
+
+def _decode_binary(body: bytes) -> OrderEvent:
+    version, code, raw_id = _BINARY.unpack(body)
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"Неизвестная версия конверта {version}")
+    return OrderEvent(_EVENT_NAMES[code], UUID(bytes=raw_id))
+
+
+_ENCODERS: dict[str, tuple[str, Callable[[OrderEvent], bytes]]] = {
+    "json": (CONTENT_TYPE_JSON, _encode_json),
+    "binary": (CONTENT_TYPE_BINARY, _encode_binary),
+}
+
+_DECODERS: dict[str, Callable[[bytes], OrderEvent]] = {
+    CONTENT_TYPE_JSON: _decode_json,
+    CONTENT_TYPE_BINARY: _decode_binary,
+}
+
+
+def encode_order_event(event: OrderEvent, fmt: str) -> tuple[bytes, str]:
+    content_type, encoder = _ENCODERS[fmt]
+    return encoder(event), content_type
+
+
+def decode_order_event(body: bytes, content_type: Optional[str]) -> OrderEvent:
+    # сообщения без content-type публиковались до появления конверта - это JSON
+    decoder = _DECODERS.get(content_type or CONTENT_TYPE_JSON)
+    if decoder is None:
+        raise ValueError(f"Неизвестный content-type {content_type}")
+
+    try:
+        return decoder(body)
+    except (AttributeError, KeyError, TypeError, struct.error) as e:
+        raise ValueError(f"Невалидное сообщение: {e}") from e
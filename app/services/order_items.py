@@ -0,0 +1,29 @@
+from typing import Iterable
+
+from app.schemas.order import OrderItem
+
+# компактное хранение позиций заказа: колонки вместо списка объектов с повторяющимися ключами
+# {"v": 1, "n": [названия], "q": [количества], "p": [цены в копейках]}
+ITEMS_FORMAT_VERSION = 1
+
+
+def pack_items(items: Iterable[OrderItem]) -> dict:
+    names: list[str] = []
+    counts: list[int] = []
+    prices: list[int] = []
+    for item in items:
+        names.append(item["name_product"])
+        counts.append(item["count_product"])
+        # цена уже в копейках - её перевёл валидатор схемы
+        prices.append(item["price_product"])
+    return {"v": ITEMS_FORMAT_VERSION, "n": names, "q": counts, "p": prices}
+
+
+def unpack_items(items: dict | list) -> list[dict]:
+    # формат ответа API не меняется; список - строки, записанные до перехода на колонки
+    if isinstance(items, list):
+        return items
+    return [
+        {"name_product": name, "count_product": count, "price_product": price / 100}
+        for name, count, price in zip(items["n"], items["q"], items["p"])
+    ]
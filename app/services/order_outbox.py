@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models.outbox_model import OrderOutboxModel
+
+outbox = OrderOutboxModel.__table__
+
+
+async def purge_sent_events(db: AsyncSession, older_than: timedelta, batch_size: int, now: datetime) -> int:
+    # одна пачка отправленных событий старше срока. id растут по времени: старые строки
+    # в начале первичного ключа, обход по нему останавливается на первых batch_size подходящих
+    candidates = (
+        select(outbox.c.id)
+        .where(outbox.c.sent_at < now - older_than)
+        .order_by(outbox.c.id)
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    res = await db.execute(delete(outbox).where(outbox.c.id.in_(candidates)))
+    return res.rowcount
@@ -0,0 +1,123 @@
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models.order_archive_model import OrderArchiveModel
+from app.database.models.order_model import CLOSED_STATUSES, OrderModel
+
+logger = logging.getLogger("order_partitions")
+
+orders = OrderModel.__table__
+archive = OrderArchiveModel.__table__
+
+# секции orders по месяцам created_at (UTC): orders_p202610 = [2026-10-01, 2026-11-01)
+PARTITION_NAME = re.compile(r"^orders_p(\d{4})(\d{2})$")
+DEFAULT_PARTITION = "orders_default"
+
+# колонки, общие для orders и orders_archive
+MOVED_COLUMNS = ("id", "user_id", "items", "total_price", "status", "created_at", "version", "updated_at")
+
+
+def is_order_partition(name: str) -> bool:
+    # для alembic: секции создаются job'ом, в метаданных моделей их нет
+    return name == DEFAULT_PARTITION or PARTITION_NAME.match(name) is not None
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"orders_p{month:%Y%m}"
+
+
+async def list_partitions(db: AsyncSession) -> dict[str, datetime]:
+    # имя секции -> начало её месяца; секция по умолчанию не входит
+    res = await db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'orders'::regclass"
+    ))
+    partitions = {}
+    for (name,) in res.all():
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[name] = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+    return partitions
+
+
+async def create_upcoming_partitions(db: AsyncSession, months_ahead: int, now: datetime) -> list[str]:
+    # текущий месяц и months_ahead следующих: вставка никогда не должна попадать в orders_default
+    existing = await list_partitions(db)
+    created = []
+    current = month_start(now)
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF orders "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+    return created
+
+
+async def archive_closed_orders(db: AsyncSession, older_than: timedelta, batch_size: int, now: datetime) -> int:
+    # одна пачка: DELETE ... RETURNING из orders и INSERT в архив одним запросом
+    candidates = (
+        select(orders.c.id, orders.c.created_at)
+        .where(orders.c.status.in_(CLOSED_STATUSES), orders.c.updated_at < now - older_than)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(orders)
+        .where(tuple_(orders.c.id, orders.c.created_at).in_(candidates))
+        .returning(*(orders.c[name] for name in MOVED_COLUMNS))
+        .cte("moved")
+    )
+    res = await db.execute(insert(archive).from_select(MOVED_COLUMNS, select(moved)))
+    return res.rowcount
+
+
+async def detach_old_partitions(db: AsyncSession, retention_months: int, now: datetime) -> list[str]:
+    # секции целиком старше срока хранения: заказы - в архив, секция отсоединяется и удаляется.
+    # отсоединяется только секция из одних закрытых заказов: worker и PATCH меняют только orders,
+    # открытый заказ в архиве уже нельзя было бы оплатить или изменить
+    boundary = add_months(month_start(now), -retention_months)
+    closed = ", ".join(f"'{order_status.value}'" for order_status in CLOSED_STATUSES)
+    columns = ", ".join(MOVED_COLUMNS)
+    detached = []
+    for name, month in sorted((await list_partitions(db)).items(), key=lambda item: item[1]):
+        if add_months(month, 1) > boundary:
+            continue
+        # не ждём блокировку бесконечно, иначе за ней выстроится очередь запросов
+        await db.execute(text("SET LOCAL lock_timeout = '5s'"))
+        # запись в секцию блокируется до DETACH: проверенный статус не изменится, чтение идёт
+        await db.execute(text(f"LOCK TABLE {name} IN EXCLUSIVE MODE"))
+        open_orders = (await db.execute(text(
+            f"SELECT count(*) FROM {name} WHERE status::text NOT IN ({closed})"
+        ))).scalar_one()
+        if open_orders:
+            await db.rollback()
+            logger.warning("Секция %s не отсоединена: в ней %s незакрытых заказов", name, open_orders)
+            continue
+
+        await db.execute(text(
+            f"INSERT INTO orders_archive ({columns}) SELECT {columns} FROM {name} ON CONFLICT (id) DO NOTHING"
+        ))
+        await db.execute(text(f"ALTER TABLE orders DETACH PARTITION {name}"))
+        await db.execute(text(f"DROP TABLE {name}"))
+        await db.commit()
+        detached.append(name)
+        logger.info("Секция %s перенесена в архив и отсоединена", name)
+    return detached
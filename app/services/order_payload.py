@@ -0,0 +1,24 @@
+import orjson
+
+from app.database.models.order_model import OrderModel
+from app.services.cache_orders import CachedOrder
+from app.services.order_items import unpack_items
+
+
+def order_to_dict(order: OrderModel) -> dict:
+    # datetime и enum orjson сериализует сам; UUID от asyncpg - не uuid.UUID, его orjson не принимает
+    return {
+        "id": str(order.id),
+        "user_id": order.user_id,
+        "items": unpack_items(order.items),
+        # Numeric приходит как Decimal, orjson его не сериализует
+        "total_price": float(order.total_price),
+        "status": order.status,
+        "created_at": order.created_at,
+    }
+
+def order_to_json(order: OrderModel) -> bytes:
+    return orjson.dumps(order_to_dict(order))
+
+def order_to_cache(order: OrderModel) -> CachedOrder:
+    return CachedOrder(str(order.id), order.user_id, order.version, order_to_json(order))
@@ -0,0 +1,184 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable
+
+from redis.asyncio.client import Pipeline
+from redis.exceptions import NoScriptError
+from sqlalchemy import Subquery, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.database.session import asyncSessionLocal
+from app.database.models.order_archive_model import OrderArchiveModel
+from app.database.models.order_model import OrderModel, OrderStatus
+
+# счётчики меняются, только если сводка уже прогрета: иначе её соберёт SQL при чтении.
+# версия растёт при каждом изменении - прогрев по устаревшему снимку её заметит
+_APPLY_DELTAS = redis_client.register_script("""
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 2, #ARGV, 3 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i] .. ':count', ARGV[i + 1])
+    redis.call('HINCRBYFLOAT', KEYS[1], ARGV[i] .. ':total', ARGV[i + 2])
+end
+return 1
+""")
+
+# прогрев записывает сводку, только если её нет и версия не менялась с начала чтения из БД:
+# иначе дельта, пришедшая во время SQL, потерялась бы или наложилась на снимок повторно
+_WARM = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+""")
+
+
+def _key(user_id: int) -> str:
+    return f"order_summary:{user_id}"
+
+
+def _version_key(user_id: int) -> str:
+    return f"order_summary_version:{user_id}"
+
+
+def _user_orders(user_id: int) -> Subquery:
+    # горячая таблица и архив: перенос в архив не меняет сводку пользователя
+    parts = [
+        select(model.status, model.total_price, model.created_at).where(model.user_id == user_id)
+        for model in (OrderModel, OrderArchiveModel)
+    ]
+    return union_all(*parts).subquery("user_orders")
+
+
+def _empty_summary() -> dict:
+    return {s.value: {"count": 0, "total_price": 0.0} for s in OrderStatus}
+
+
+SummaryCall = tuple[list[str], list]
+
+
+def queue_summary_deltas(
+    pipe: Pipeline, deltas: Iterable[tuple[int, OrderStatus, int, Decimal]]
+) -> list[SummaryCall]:
+    # deltas: (user_id, статус, изменение количества, изменение суммы).
+    # сразу EVALSHA: скрипт, зарегистрированный на pipeline, добавил бы SCRIPT EXISTS перед каждым execute
+    per_user: dict[int, list] = defaultdict(list)
+    for user_id, order_status, count, total in deltas:
+        # HINCRBYFLOAT принимает строку, Decimal передаётся без потери точности
+        per_user[user_id].extend((order_status.value, count, str(total)))
+
+    calls = []
+    for user_id, args in per_user.items():
+        keys = [_key(user_id), _version_key(user_id)]
+        args = [settings.ORDER_SUMMARY_CACHE_TTL_SECONDS, *args]
+        pipe.evalsha(_APPLY_DELTAS.sha, len(keys), *keys, *args)
+        calls.append((keys, args))
+    return calls
+
+
+async def finish_summary_deltas(calls: list[SummaryCall], results: list) -> None:
+    # результаты queue_summary_deltas из pipeline, выполненного с raise_on_error=False
+    for (keys, args), result in zip(calls, results):
+        if isinstance(result, NoScriptError):
+            # скрипт ещё не загружен (redis перезапущен): команда не выполнилась, повтор её загрузит
+            await _APPLY_DELTAS(keys=keys, args=args)
+        elif isinstance(result, Exception):
+            raise result
+
+
+async def apply_summary_deltas(deltas: Iterable[tuple[int, OrderStatus, int, Decimal]]) -> None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        calls = queue_summary_deltas(pipe, deltas)
+        if not calls:
+            return
+        results = await pipe.execute(raise_on_error=False)
+    await finish_summary_deltas(calls, results)
+
+
+def created_deltas(user_id: int, totals: Iterable[Decimal]) -> list[tuple[int, OrderStatus, int, Decimal]]:
+    totals = list(totals)
+    return [(user_id, OrderStatus.PENDING, len(totals), sum(totals, Decimal(0)))]
+
+
+def status_change_deltas(
+    user_id: int, old: OrderStatus, new: OrderStatus, total: Decimal
+) -> list[tuple[int, OrderStatus, int, Decimal]]:
+    if old == new:
+        return []
+    return [(user_id, old, -1, -total), (user_id, new, 1, total)]
+
+
+async def get_status_summary(user_id: int) -> dict:
+    # сводка и её версия - один round trip
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hgetall(_key(user_id))
+        pipe.get(_version_key(user_id))
+        raw, version = await pipe.execute()
+
+    if raw:
+        summary = _empty_summary()
+        for field, value in raw.items():
+            order_status, metric = field.split(":")
+            if metric == "count":
+                summary[order_status]["count"] = int(value)
+            else:
+                summary[order_status]["total_price"] = round(float(value), 2)
+        return summary
+
+    # промах: агрегаты по индексам (user_id, created_at) обеих таблиц, результат прогревает счётчики.
+    # читаем с primary: отстающая реплика закрепила бы в redis устаревшие счётчики
+    user_orders = _user_orders(user_id)
+    async with asyncSessionLocal() as db:
+        res = await db.execute(
+            select(user_orders.c.status, func.count(), func.coalesce(func.sum(user_orders.c.total_price), 0))
+            .group_by(user_orders.c.status)
+        )
+        rows = res.all()
+
+    summary = _empty_summary()
+    for order_status, count, total in rows:
+        summary[order_status.value] = {"count": count, "total_price": round(float(total), 2)}
+
+    mapping = []
+    for order_status, values in summary.items():
+        mapping.extend((f"{order_status}:count", values["count"], f"{order_status}:total", values["total_price"]))
+
+    # заказ изменился во время чтения - отдаём снимок, но не кешируем: соберёт следующий запрос
+    await _WARM(
+        keys=[_key(user_id), _version_key(user_id)],
+        args=[version or "0", settings.ORDER_SUMMARY_CACHE_TTL_SECONDS, *mapping],
+    )
+
+    return summary
+
+
+async def get_daily_buckets(db: AsyncSession, user_id: int, date_from: datetime, date_to: datetime) -> list[dict]:
+    user_orders = _user_orders(user_id)
+    day = func.date_trunc("day", user_orders.c.created_at).label("day")
+    res = await db.execute(
+        select(day, user_orders.c.status, func.count(), func.sum(user_orders.c.total_price))
+        .where(
+            user_orders.c.created_at >= date_from,
+            user_orders.c.created_at < date_to,
+        )
+        .group_by(day, user_orders.c.status)
+        .order_by(day)
+    )
+
+    buckets: dict[str, dict] = {}
+    for bucket_day, order_status, count, total in res.all():
+        bucket = buckets.setdefault(bucket_day.date().isoformat(), _empty_summary())
+        bucket[order_status.value] = {"count": count, "total_price": round(float(total), 2)}
+
+    return [{"day": bucket_day, "by_status": by_status} for bucket_day, by_status in buckets.items()]
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from typing import Iterable
+
+import orjson
+
+from app.core.config import settings
+from app.core.metrics import ORDER_UPDATES_SUBSCRIBERS
+from app.core.redis import redis_binary_client
+
+
+logger = logging.getLogger("order_updates")
+
+# один общий stream изменений статусов: пишут API (PATCH) и worker,
+# каждый процесс API читает его одним XREAD и раздаёт своим подписчикам
+UPDATES_STREAM = "order_status_updates"
+
+
+def _stream_id(raw: bytes | str) -> tuple[int, int]:
+    ms, _, seq = (raw.decode() if isinstance(raw, bytes) else raw).partition("-")
+    return int(ms), int(seq or 0)
+
+
+async def publish_order_updates(rows: Iterable) -> None:
+    # rows - строки заказов (id, user_id, status, version); одна пачка - один round trip
+    async with redis_binary_client.pipeline(transaction=False) as pipe:
+        for row in rows:
+            # UUID от asyncpg - не uuid.UUID, orjson его не сериализует
+            data = orjson.dumps({"order_id": str(row.id), "status": row.status, "version": row.version})
+            pipe.xadd(
+                UPDATES_STREAM,
+                {"u": row.user_id, "d": data},
+                maxlen=settings.ORDER_UPDATES_STREAM_MAXLEN,
+                approximate=True,
+            )
+        await pipe.execute()
+
+
+class Subscription:
+    __slots__ = ("user_id", "queue", "closed")
+
+    def __init__(self, user_id: int) -> None:
+        self.user_id = user_id
+        # None в очереди - будит ожидающий поток, чтобы он завершился
+        self.queue: asyncio.Queue[tuple[str, bytes] | None] = asyncio.Queue(settings.ORDER_UPDATES_QUEUE_SIZE)
+        # клиент не успевает читать или процесс останавливается - соединение закрывается,
+        # клиент переподключится с Last-Event-ID
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class OrderUpdatesHub:
+    """Раздаёт события из redis stream подписчикам этого процесса по user_id.
+
+    Простаивающее соединение - только очередь в словаре, на событие -
+    один поиск по user_id, поэтому тысячи подключений на процесс дешёвые.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._closed = False
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        ORDER_UPDATES_SUBSCRIBERS.inc()
+        if self._closed:
+            subscription.close()
+        return subscription
+
+    def close_all(self) -> None:
+        # остановка процесса: SSE-потоки завершаются сразу, не дожидаясь таймаута остановки сервера
+        self._closed = True
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                subscription.close()
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+        ORDER_UPDATES_SUBSCRIBERS.dec()
+
+    def _dispatch(self, entry_id: str, fields: dict) -> None:
+        subscribers = self._subscribers.get(int(fields[b"u"]))
+        if not subscribers:
+            return
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait((entry_id, fields[b"d"]))
+            except asyncio.QueueFull:
+                subscription.closed = True
+
+    async def run(self) -> None:
+        last_id = "$"
+        while True:
+            try:
+                response = await redis_binary_client.xread({UPDATES_STREAM: last_id}, block=5000, count=500)
+                for _stream, entries in response or ():
+                    for entry_id, fields in entries:
+                        last_id = entry_id.decode()
+                        self._dispatch(last_id, fields)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка чтения stream обновлений заказов, повтор")
+                await asyncio.sleep(1)
+
+
+hub = OrderUpdatesHub()
+
+
+async def read_backlog(user_id: int, after_id: str) -> list[tuple[str, bytes]] | None:
+    # события пользователя после after_id; None - часть истории уже обрезана, нужна полная перезагрузка
+    try:
+        after = _stream_id(after_id)
+    except ValueError:
+        return None
+
+    first = await redis_binary_client.xrange(UPDATES_STREAM, "-", "+", count=1)
+    if first and _stream_id(first[0][0]) > after:
+        return None
+
+    backlog: list[tuple[str, bytes]] = []
+    scanned = 0
+    start = f"({after[0]}-{after[1]}"
+    while True:
+        entries = await redis_binary_client.xrange(UPDATES_STREAM, start, "+", count=1000)
+        for entry_id, fields in entries:
+            if int(fields[b"u"]) == user_id:
+                backlog.append((entry_id.decode(), fields[b"d"]))
+        scanned += len(entries)
+        if len(entries) < 1000:
+            return backlog
+        if scanned >= settings.ORDER_UPDATES_BACKLOG_MAX:
+            return None
+        start = "(" + entries[-1][0].decode()
+
+
+def _sse(entry_id: str, data: bytes) -> bytes:
+    return b"id: %s\nevent: order_status\ndata: %s\n\n" % (entry_id.encode(), data)
+
+
+async def sse_stream(user_id: int, last_event_id: str | None):
+    subscription = hub.subscribe(user_id)
+    try:
+        yield b"retry: 3000\n\n"
+
+        last_sent: tuple[int, int] | None = None
+        if last_event_id:
+            # подписаны до чтения истории: события между ними придут в очередь, дубли отсекаем по id
+            backlog = await read_backlog(user_id, last_event_id)
+            if backlog is None:
+                yield b"event: reset\ndata: {}\n\n"
+            else:
+                for entry_id, data in backlog:
+                    last_sent = _stream_id(entry_id)
+                    yield _sse(entry_id, data)
+
+        while not subscription.closed:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.ORDER_UPDATES_HEARTBEAT_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                # комментарий SSE держит соединение открытым через прокси
+                yield b": ping\n\n"
+                continue
+            if event is None:
+                break
+
+            entry_id, data = event
+            current = _stream_id(entry_id)
+            if last_sent is not None and current <= last_sent:
+                continue
+            last_sent = current
+            yield _sse(entry_id, data)
+    finally:
+        hub.unsubscribe(subscription)
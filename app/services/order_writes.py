@@ -0,0 +1,33 @@
+from decimal import Decimal
+from typing import Iterable
+
+from app.core.metrics import CACHE_REDIS_SECONDS, timed
+from app.core.redis import redis_binary_client
+from app.database.models.order_model import OrderStatus
+from app.services.cache_orders import CachedOrder, queue_cached_orders
+from app.services.order_summary import finish_summary_deltas, queue_summary_deltas
+from app.services.read_your_writes import queue_user_wrote
+
+_redis_set_seconds = CACHE_REDIS_SECONDS.labels("order", "set")
+
+
+async def publish_order_writes(
+    entries: list[CachedOrder],
+    deltas: Iterable[tuple[int, OrderStatus, int, Decimal]],
+    user_id: int | None = None,
+    invalidate: bool = False,
+) -> None:
+    # после записи заказов: кеш, счётчики сводки и метка read-your-writes (user_id) - один round trip
+    with timed(_redis_set_seconds):
+        async with redis_binary_client.pipeline(transaction=False) as pipe:
+            calls = queue_summary_deltas(pipe, deltas)
+            queue_cached_orders(pipe, entries, invalidate)
+            if user_id is not None:
+                queue_user_wrote(pipe, user_id)
+            results = await pipe.execute(raise_on_error=False)
+
+    # первыми в pipeline стоят дельты сводки, их NOSCRIPT разбирается отдельно
+    await finish_summary_deltas(calls, results[:len(calls)])
+    for result in results[len(calls):]:
+        if isinstance(result, Exception):
+            raise result
@@ -1,27 +1,153 @@
-import json
+import asyncio
 import logging
+from typing import Awaitable, Callable, Optional
 from uuid import UUID
+
 import aio_pika
+from aio_pika.abc import AbstractChannel, AbstractRobustConnection
 
 from app.core.config import settings
+from app.core.metrics import RABBIT_PUBLISH_SECONDS, RABBIT_PUBLISHED, timed
+from app.core.tracing import TRACE_ID_HEADER, span
+from app.services.order_events import (
+    CONTENT_TYPE_JSON,
+    ENVELOPE_VERSION,
+    ENVELOPE_VERSION_HEADER,
+    OrderEvent,
+    encode_order_event,
+)
+
+
+logger = logging.getLogger("orders")
+
+
+class RabbitPublisher:
+    """Долгоживущий publisher: одно robust-соединение и пул каналов с подтверждениями.
+
+    Очередь объявляется один раз при старте, дальше публикации
+    распределяются по каналам по кругу. Confirms на одном канале
+    идут конвейером, поэтому канал не блокируется на время ожидания.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        queue_name: str,
+        pool_size: int = 4,
+        connect: Callable[[str], Awaitable[AbstractRobustConnection]] = aio_pika.connect_robust,
+    ) -> None:
+        self._url = url
+        self._queue_name = queue_name
+        self._pool_size = pool_size
+        self._connect = connect
+
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channels: list[AbstractChannel] = []
+        self._next = 0
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def is_started(self) -> bool:
+        return self._connection is not None
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self._connection is not None:
+                return
 
+            connection = await self._connect(self._url)
 
-async def publish_new_order(order_id: UUID) -> None:
-    conn = await aio_pika.connect_robust(settings.RABBIT_URL)
+            # состояние publisher меняется, только когда открылось всё: после частичной ошибки
+            # не остаются полуоткрытые каналы, а повторный start не добавляет дубликаты
+            channels: list[AbstractChannel] = []
+            try:
+                for i in range(self._pool_size):
+                    channel = await connection.channel(publisher_confirms=True)
+                    if i == 0:
+                        await channel.declare_queue(self._queue_name, durable=True)
+                    channels.append(channel)
+            except BaseException:
+                await connection.close()
+                raise
 
-    async with conn:
-        channel = await conn.channel()
+            self._channels = channels
+            self._connection = connection
+            logger.info("RabbitMQ publisher запущен, каналов=%s", self._pool_size)
 
-        queue_name = settings.NEW_ORDER_QUEUE
-        await channel.declare_queue(queue_name, durable=True)
+    async def close(self) -> None:
+        async with self._start_lock:
+            if self._connection is None:
+                return
 
-        message = aio_pika.Message(
-            body=json.dumps({"order_id": str(order_id)}).encode(),
+            for channel in self._channels:
+                if not channel.is_closed:
+                    await channel.close()
+            self._channels.clear()
+
+            await self._connection.close()
+            self._connection = None
+
+    async def _acquire(self) -> AbstractChannel:
+        if self._connection is None:
+            await self.start()
+
+        index = self._next % len(self._channels)
+        self._next += 1
+        channel = self._channels[index]
+
+        # robust-соединение само восстанавливает каналы, но если канал
+        # закрыли явно (например, ошибкой брокера) - заменяем его новым
+        if channel.is_closed:
+            channel = await self._connection.channel(publisher_confirms=True)
+            self._channels[index] = channel
+        return channel
+
+    def _message(self, body: bytes, content_type: str, trace_id: Optional[str] = None) -> aio_pika.Message:
+        headers = {ENVELOPE_VERSION_HEADER: ENVELOPE_VERSION}
+        if trace_id:
+            headers[TRACE_ID_HEADER] = trace_id
+        return aio_pika.Message(
+            body=body,
+            content_type=content_type,
+            headers=headers,
             delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
         )
 
-        logger = logging.getLogger("orders")
+    async def publish(self, body: bytes, content_type: str = CONTENT_TYPE_JSON) -> None:
+        channel = await self._acquire()
+        await channel.default_exchange.publish(self._message(body, content_type), routing_key=self._queue_name)
+
+    async def publish_batch(
+        self,
+        bodies: list[bytes],
+        content_type: str = CONTENT_TYPE_JSON,
+        trace_ids: Optional[list[Optional[str]]] = None,
+    ) -> None:
+        # все сообщения пачки уходят в один канал, confirms ждём параллельно
+        channel = await self._acquire()
+        trace_ids = trace_ids or [None] * len(bodies)
+        await asyncio.gather(*(
+            channel.default_exchange.publish(self._message(body, content_type, trace_id), routing_key=self._queue_name)
+            for body, trace_id in zip(bodies, trace_ids)
+        ))
+
+
+publisher = RabbitPublisher(
+    settings.RABBIT_URL,
+    settings.NEW_ORDER_QUEUE,
+    pool_size=settings.RABBIT_CHANNEL_POOL_SIZE,
+)
+
+
+async def publish_new_order_events(order_ids: list[UUID], trace_ids: Optional[list[Optional[str]]] = None) -> None:
+    content_type = CONTENT_TYPE_JSON
+    bodies = []
+    for order_id in order_ids:
+        body, content_type = encode_order_event(OrderEvent("new_order", order_id), settings.ORDER_EVENT_FORMAT)
+        bodies.append(body)
 
-        logger.info("RabbitMQ публикация: очередь=%s payload=%s", settings.NEW_ORDER_QUEUE, message.body,)
+    logger.info("RabbitMQ публикация: очередь=%s событий=%s", settings.NEW_ORDER_QUEUE, len(bodies))
 
-        await channel.default_exchange.publish(message, routing_key=queue_name)
+    with timed(RABBIT_PUBLISH_SECONDS), span("rabbit.publish", events=len(bodies)):
+        await publisher.publish_batch(bodies, content_type, trace_ids)
+    RABBIT_PUBLISHED.inc(len(bodies))
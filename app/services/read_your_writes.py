@@ -0,0 +1,30 @@
+from redis.asyncio.client import Pipeline
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.database.session import asyncSessionLocal, read_sessionmaker, replicas
+
+
+# метка в redis общая для всех реплик API: после записи пользователь
+# какое-то время читает с primary и видит свои изменения несмотря на лаг
+def _key(user_id: int) -> str:
+    return f"rw:sticky:{user_id}"
+
+
+def queue_user_wrote(pipe: Pipeline, user_id: int) -> None:
+    # метка уходит в redis тем же pipeline, что и кеш заказа после записи
+    if replicas:
+        pipe.set(_key(user_id), 1, ex=settings.READ_YOUR_WRITES_SECONDS)
+
+
+async def is_user_sticky(user_id: int) -> bool:
+    if not replicas:
+        return False
+    return bool(await redis_client.exists(_key(user_id)))
+
+
+async def read_sessionmaker_for(user_id: int) -> async_sessionmaker:
+    if await is_user_sticky(user_id):
+        return asyncSessionLocal
+    return read_sessionmaker()
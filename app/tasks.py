@@ -1,21 +1,140 @@
-import asyncio
 import logging
+import time
 from uuid import UUID
+from sqlalchemy import update
+from taskiq import Context, TaskiqDepends, TaskiqEvents, TaskiqState
 from taskiq_redis import RedisStreamBroker
 from app.core.config import settings
+from app.core.metrics import ORDERS_PROCESSED, TASK_SECONDS, start_metrics_server
+from app.core.tracing import finish_trace, is_sampled, start_trace
+from app.core.redis import redis_client
+from app.database.models.order_model import OrderModel, OrderStatus
+from app.database.session import asyncSessionLocal
+from app.database.repositories.order_read_repository import ORDER_COLUMNS
+from app.services.order_payload import order_to_cache
+from app.services.order_updates import publish_order_updates
+from app.services.order_summary import status_change_deltas
+from app.services.order_writes import publish_order_writes
 
 message_broker = RedisStreamBroker(settings.REDIS_URL)
 
 logger = logging.getLogger("worker")
 
+_orders_paid = ORDERS_PROCESSED.labels("paid")
+_orders_duplicate = ORDERS_PROCESSED.labels("duplicate")
+_orders_skipped = ORDERS_PROCESSED.labels("skipped")
+
+
+@message_broker.on_event(TaskiqEvents.WORKER_STARTUP)
+async def _start_metrics(state: TaskiqState) -> None:
+    # воркеров несколько - порт займёт первый, метрики общие через PROMETHEUS_MULTIPROC_DIR
+    start_metrics_server(settings.METRICS_PORT)
+
+
+def _processed_key(order_id: UUID) -> str:
+    return f"order:processed:{order_id}"
+
+
+async def _claim(order_ids: list[UUID]) -> list[UUID]:
+    # ключ идемпотентности: повторная доставка того же заказа - дешёвый no-op.
+    # до commit ключ живёт недолго: если воркер упадёт посреди пачки,
+    # заказ обработает повторная доставка, а не через сутки
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for order_id in order_ids:
+            pipe.set(_processed_key(order_id), "1", nx=True, ex=settings.ORDER_CLAIM_TTL_SECONDS)
+        claimed = await pipe.execute()
+
+    return [order_id for order_id, ok in zip(order_ids, claimed) if ok]
+
+
+async def _confirm(order_ids: list[UUID]) -> None:
+    # после commit заказ обработан: ключ продлевается на полный срок
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for order_id in order_ids:
+            pipe.expire(_processed_key(order_id), settings.ORDER_PROCESSED_KEY_TTL_SECONDS)
+        await pipe.execute()
+
+
+async def _release(order_ids: list[UUID]) -> None:
+    await redis_client.delete(*(_processed_key(order_id) for order_id in order_ids))
+
+
+async def _process_batch(order_ids: list[UUID]) -> None:
+    unique = list(dict.fromkeys(order_ids))
+    claimed = await _claim(unique)
+    if len(claimed) < len(unique):
+        logger.info("Пропущено повторных доставок: %s", len(unique) - len(claimed))
+        _orders_duplicate.inc(len(unique) - len(claimed))
+    if not claimed:
+        return
+
+    logger.info("Обработка заказов... количество=%s", len(claimed))
+
+    try:
+        # переход PENDING -> PAID одним условным UPDATE на всю пачку
+        async with asyncSessionLocal() as db:
+            res = await db.execute(
+                update(OrderModel)
+                .where(OrderModel.id.in_(claimed), OrderModel.status == OrderStatus.PENDING)
+                .values(status=OrderStatus.PAID, version=OrderModel.version + 1)
+                .returning(*ORDER_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )
+            rows = res.all()
+            await db.commit()
+    except Exception:
+        # без ключей заказы обработаются при повторной доставке
+        await _release(claimed)
+        raise
+
+    await _confirm(claimed)
+
+    if rows:
+        await publish_order_writes(
+            [order_to_cache(row) for row in rows],
+            (
+                delta
+                for row in rows
+                for delta in status_change_deltas(row.user_id, OrderStatus.PENDING, OrderStatus.PAID, row.total_price)
+            ),
+            invalidate=True,
+        )
+        await publish_order_updates(rows)
+
+    skipped = len(claimed) - len(rows)
+    if skipped:
+        logger.info("Заказы не в статусе PENDING, пропущено: %s", skipped)
+        _orders_skipped.inc(skipped)
+    _orders_paid.inc(len(rows))
+
+    logger.info("Заказы обработаны! оплачено=%s", len(rows))
+
+
+async def _timed_batch(task: str, order_ids: list[UUID], context: Context) -> None:
+    # задача с id трассировки от API трассируется всегда, чтобы заказ можно было проследить целиком
+    trace_ids = [t for t in context.message.labels.get("trace_ids", "").split(",") if t]
+    trace = None
+    if trace_ids or is_sampled():
+        trace = start_trace(task, trace_ids[0] if trace_ids else None, orders=len(order_ids), trace_ids=trace_ids)
+
+    started = time.perf_counter()
+    status = "error"
+    try:
+        await _process_batch(order_ids)
+        status = "ok"
+    finally:
+        TASK_SECONDS.labels(task, status).observe(time.perf_counter() - started)
+        if trace is not None:
+            trace[0].attrs["status"] = status
+            finish_trace(*trace, keep=bool(trace_ids))
+
+
 @message_broker.task
-async def process_order(order_id: str) -> None:
-    order_uuid = UUID(order_id)
+async def process_order(order_id: str, context: Context = TaskiqDepends()) -> None:
+    await _timed_batch("process_order", [UUID(order_id)], context)
 
-    logger.info("Обработка заказа... order_id=%s", order_uuid)
-    print(f"Processing order {order_id}...")
 
-    await asyncio.sleep(2)
-    
-    logger.info("Заказ обработан! order_id=%s", order_uuid)
-    print(f"Order {order_id} processed")
\ No newline at end of file
+@message_broker.task
+async def process_orders(order_ids: list[str], context: Context = TaskiqDepends()) -> None:
+    # пачка заказов от consumer - одна задача в redis stream и один UPDATE в БД
+    await _timed_batch("process_orders", [UUID(order_id) for order_id in order_ids], context)
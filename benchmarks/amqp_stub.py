@@ -0,0 +1,119 @@
+import asyncio
+from collections import defaultdict, deque
+
+
+class StubBroker:
+    """Локальная замена RabbitMQ: хранит сообщения в памяти и имитирует сетевые задержки."""
+
+    def __init__(self, connect_latency: float = 0.003, rtt: float = 0.0003) -> None:
+        self.connect_latency = connect_latency
+        self.rtt = rtt
+        self.queues: dict[str, deque] = defaultdict(deque)
+        self.connections_opened = 0
+
+    async def connect(self, url: str) -> "StubConnection":
+        # TCP + AMQP handshake
+        await asyncio.sleep(self.connect_latency)
+        self.connections_opened += 1
+        return StubConnection(self)
+
+
+class StubConnection:
+    def __init__(self, broker: StubBroker) -> None:
+        self.broker = broker
+        self.is_closed = False
+
+    async def channel(self, publisher_confirms: bool = True) -> "StubChannel":
+        await asyncio.sleep(self.broker.rtt)
+        return StubChannel(self.broker)
+
+    async def close(self) -> None:
+        await asyncio.sleep(self.broker.rtt)
+        self.is_closed = True
+
+    async def __aenter__(self) -> "StubConnection":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+class StubExchange:
+    def __init__(self, broker: StubBroker) -> None:
+        self.broker = broker
+
+    async def publish(self, message, routing_key: str) -> None:
+        # publish + ожидание confirm
+        await asyncio.sleep(self.broker.rtt)
+        self.broker.queues[routing_key].append(message.body)
+
+
+class StubChannel:
+    def __init__(self, broker: StubBroker) -> None:
+        self.broker = broker
+        self.is_closed = False
+        self.default_exchange = StubExchange(broker)
+
+    async def declare_queue(self, name: str, durable: bool = True) -> None:
+        await asyncio.sleep(self.broker.rtt)
+        self.broker.queues.setdefault(name, deque())
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+
+class StubIncomingMessage:
+    def __init__(self, delivery: "StubDelivery", delivery_tag: int, body: bytes, content_type=None, headers=None) -> None:
+        self._delivery = delivery
+        self.delivery_tag = delivery_tag
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    async def ack(self, multiple: bool = False) -> None:
+        # как aiormq: отправка кадра ждёт drain сокета, управление уходит в event loop
+        await asyncio.sleep(0)
+        self._delivery.settle(self.delivery_tag, multiple)
+
+    async def nack(self, requeue: bool = True) -> None:
+        await asyncio.sleep(0)
+        self._delivery.settle(self.delivery_tag, False)
+        if requeue:
+            self._delivery.requeued += 1
+
+
+class StubDelivery:
+    """Доставка сообщений потребителю с учётом prefetch_count и basic.ack(multiple)."""
+
+    def __init__(self, prefetch_count: int) -> None:
+        self.prefetch_count = prefetch_count
+        self.unacked: set[int] = set()
+        self.ack_calls = 0
+        self.requeued = 0
+        self._credit = asyncio.Event()
+        self._credit.set()
+
+    def settle(self, delivery_tag: int, multiple: bool) -> None:
+        # брокер закрывает канал при подтверждении неизвестного или уже подтверждённого tag
+        if delivery_tag not in self.unacked:
+            raise RuntimeError(f"PRECONDITION_FAILED - unknown delivery tag {delivery_tag}")
+        self.ack_calls += 1
+        if multiple:
+            self.unacked = {tag for tag in self.unacked if tag > delivery_tag}
+        else:
+            self.unacked.discard(delivery_tag)
+        if len(self.unacked) < self.prefetch_count:
+            self._credit.set()
+
+    async def deliver(self, bodies, callback, content_type=None, headers=None) -> None:
+        for tag, body in enumerate(bodies, start=1):
+            while len(self.unacked) >= self.prefetch_count:
+                self._credit.clear()
+                await self._credit.wait()
+            self.unacked.add(tag)
+            await callback(StubIncomingMessage(self, tag, body, content_type, headers))
+
+    async def wait_settled(self) -> None:
+        while self.unacked:
+            self._credit.clear()
+            await self._credit.wait()
@@ -0,0 +1,64 @@
+﻿"""Пропускная способность consumer (сообщений/сек) в зависимости от числа обработчиков.
+
+Брокер и TaskIQ заменены заглушками в памяти, постановка задачи имитирует
+один XADD в redis с редкими медленными записями.
+
+Запуск: python -m benchmarks.bench_consumer
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from app.consumer import OrderConsumer
+from benchmarks.amqp_stub import StubDelivery
+
+
+def make_dispatch(rtt: float, slow_every: int, slow_delay: float):
+    calls = 0
+
+    async def dispatch(order_ids: list[str], trace_ids: list[str]) -> None:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(slow_delay if calls % slow_every == 0 else rtt)
+
+    return dispatch
+
+
+async def run(total: int, prefetch: int, concurrency: int, batch_size: int, dispatch) -> tuple[float, int]:
+    bodies = [json.dumps({"order_id": str(uuid.uuid4())}).encode() for _ in range(total)]
+    delivery = StubDelivery(prefetch)
+    consumer = OrderConsumer(dispatch, concurrency=concurrency, batch_size=batch_size)
+    consumer.start()
+
+    started = time.perf_counter()
+    await delivery.deliver(bodies, consumer.on_message)
+    await delivery.wait_settled()
+    elapsed = time.perf_counter() - started
+
+    await consumer.drain(timeout=1)
+    return total / elapsed, delivery.ack_calls
+
+
+async def main(total: int, prefetch: int, batch_size: int, rtt: float) -> None:
+    import logging
+    logging.getLogger("consumer").setLevel(logging.WARNING)
+
+    # прежний цикл: по одному сообщению, без prefetch и без пачек
+    rate, acks = await run(total, 1, 1, 1, make_dispatch(rtt, 50, 0.02))
+    print(f"{'sequential':>12}: {rate:10.0f} msg/sec  acks={acks}")
+
+    for concurrency in (1, 2, 4, 8, 16, 32):
+        rate, acks = await run(total, prefetch, concurrency, batch_size, make_dispatch(rtt, 50, 0.02))
+        print(f"{'c=' + str(concurrency):>12}: {rate:10.0f} msg/sec  acks={acks}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--total", type=int, default=20000)
+    parser.add_argument("--prefetch", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--rtt", type=float, default=0.0005)
+    args = parser.parse_args()
+    asyncio.run(main(args.total, args.prefetch, args.batch_size, args.rtt))
@@ -0,0 +1,72 @@
+"""CPU-стоимость декодирования одного сообщения new_order по форматам.
+
+Запуск: python -m benchmarks.bench_decode
+"""
+import argparse
+import io
+import json
+import logging
+import timeit
+import uuid
+from typing import Any, Dict, Optional, Union
+from uuid import UUID
+
+from app.services.order_events import OrderEvent, decode_order_event, encode_order_event
+
+
+def legacy_decode(body: bytes) -> Optional[str]:
+    # прежний путь consumer: decode, json.loads, проверка типа, UUID(str(...))
+    raw = body.decode("utf-8")
+    try:
+        payload: Union[Dict[str, Any], str] = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(payload, str):
+        payload = {"order_id": payload}
+    if not isinstance(payload, dict):
+        return None
+    order_id = payload.get("order_id")
+    if order_id is None:
+        return None
+    return str(UUID(str(order_id)))
+
+
+def legacy_decode_logged(body: bytes, logger: logging.Logger) -> Optional[str]:
+    # плюс три INFO-записи на сообщение, как было в consumer
+    logger.info("2. Сообщение получено =%s", body.decode("utf-8"))
+    order_id = legacy_decode(body)
+    logger.info("3. Payload декодирован =%s", order_id)
+    logger.info("4. Извлечен order_id=%s", order_id)
+    return order_id
+
+
+def main(number: int) -> None:
+    logger = logging.getLogger("bench_decode")
+    logger.addHandler(logging.StreamHandler(io.StringIO()))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    event = OrderEvent("new_order", uuid.uuid4())
+    legacy_body = json.dumps({"order_id": str(event.order_id)}).encode()
+    json_body, json_type = encode_order_event(event, "json")
+    binary_body, binary_type = encode_order_event(event, "binary")
+
+    cases = {
+        "legacy + logs": lambda: legacy_decode_logged(legacy_body, logger),
+        "legacy json": lambda: legacy_decode(legacy_body),
+        "envelope json": lambda: decode_order_event(json_body, json_type),
+        "envelope binary": lambda: decode_order_event(binary_body, binary_type),
+    }
+
+    print(f"{'format':>16} {'bytes':>6} {'ns/msg':>8}")
+    sizes = {"legacy + logs": len(legacy_body), "legacy json": len(legacy_body), "envelope json": len(json_body), "envelope binary": len(binary_body)}
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=number, repeat=5))
+        print(f"{name:>16} {sizes[name]:>6} {best / number * 1e9:>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+    main(args.number)
@@ -0,0 +1,348 @@
+"""Нагрузочный тест API в одном процессе с локальными заменами внешних сервисов.
+
+Приложение поднимается через httpx.ASGITransport, БД - SQLite (aiosqlite) или локальный
+PostgreSQL, Redis - fakeredis, RabbitMQ - StubBroker, TaskIQ - прямой вызов обработчика пачки.
+На каждом уровне конкурентности виртуальные пользователи регистрируются, логинятся и выполняют
+смесь запросов: создание заказа, чтение из кеша и мимо кеша, PATCH статуса, список заказов.
+Результат - JSON с пропускной способностью и перцентилями задержек по каждому endpoint.
+
+Запуск:
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_load --concurrency 1,8,32 --requests-per-user 100 --output load.json
+    python -m benchmarks.bench_load --compare baseline.json load.json --threshold 0.2
+
+PostgreSQL: --database-url postgresql+asyncpg://... (пустая отдельная БД, таблицы пересоздаются).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+# лимиты запросов в тесте не мешают, rate limiter при этом всё равно работает
+_RATE_LIMITS = (
+    "REGISTER", "LOGIN", "ORDER_CREATE", "ORDER_BATCH", "ORDER_GET", "ORDER_PATCH",
+    "ORDER_LIST", "ORDER_SUMMARY", "ORDER_UPDATES", "DIAGNOSTICS",
+)
+
+# операция -> вес в смеси
+MIX = {
+    "create": 20,
+    "get_cached": 35,
+    "get_uncached": 10,
+    "patch": 10,
+    "list": 25,
+}
+
+STATUSES = ("PAID", "SHIPPED", "CANCELED", "PENDING")
+
+
+def configure_env(database_url: str, bcrypt_rounds: int) -> None:
+    # настройки читаются при импорте app.core.config, поэтому до импорта приложения
+    os.environ.update({
+        "DATABASE_URL": database_url,
+        "JWT_SECRET_KEY": "bench-secret",
+        "JWT_ALGORITHM": "HS256",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "REDIS_URL": "redis://fakeredis:6379/0",
+        "ORDER_CACHE_EXPIRE_SECONDS": "300",
+        "RABBIT_URL": "amqp://stub",
+        "NEW_ORDER_QUEUE": "new_order",
+        "BCRYPT_ROUNDS": str(bcrypt_rounds),
+        "DB_ECHO": "false",
+        "TRACE_SAMPLE_RATE": "0",
+    })
+    for name in _RATE_LIMITS:
+        os.environ[f"RATE_LIMIT_{name}"] = "1000000/second"
+
+
+def use_fakeredis() -> None:
+    import fakeredis
+    from fakeredis.aioredis import FakeConnection
+    from redis.asyncio import ConnectionPool
+
+    from app.core.redis import redis_binary_client, redis_client
+
+    # клиенты уже импортированы модулями приложения - меняем только их пулы соединений
+    server = fakeredis.FakeServer()
+    for client, decode in ((redis_client, True), (redis_binary_client, False)):
+        client.connection_pool = ConnectionPool(
+            connection_class=FakeConnection, server=server, decode_responses=decode,
+        )
+
+
+async def prepare_database(database_url: str) -> None:
+    from datetime import datetime, timezone
+
+    from sqlalchemy import event, text
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    import app.database.sqlite_compat  # noqa: F401
+    from app.services.order_partitions import DEFAULT_PARTITION, create_upcoming_partitions
+    from app.database.database import Base
+    from app.database.session import engine
+    import app.database.models  # noqa: F401
+
+    if database_url.startswith("sqlite"):
+        @event.listens_for(engine.sync_engine, "connect")
+        def _sqlite_pragmas(dbapi_conn, _):
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA busy_timeout=30000")
+            cursor.close()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        if conn.dialect.name == "postgresql":
+            # create_all создаёт orders без секций - как в миграции, секция по умолчанию и текущий месяц
+            await conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF orders DEFAULT"))
+            async with AsyncSession(conn) as db:
+                await create_upcoming_partitions(db, 0, datetime.now(timezone.utc))
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def add(self, name: str, seconds: float, ok: bool) -> None:
+        self.latencies.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            values.sort()
+            endpoints[name] = {
+                "count": len(values),
+                "errors": self.errors.get(name, 0),
+                "rps": round(len(values) / elapsed, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 3),
+                "p50_ms": _percentile(values, 50),
+                "p90_ms": _percentile(values, 90),
+                "p99_ms": _percentile(values, 99),
+                "max_ms": round(values[-1] * 1000, 3),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {"requests": total, "throughput_rps": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+def _percentile(sorted_values: list[float], p: int) -> float:
+    # nearest-rank: стабильно для одинаковых входных данных
+    index = max(0, min(len(sorted_values) - 1, -(-len(sorted_values) * p // 100) - 1))
+    return round(sorted_values[index] * 1000, 3)
+
+
+class VirtualUser:
+    def __init__(self, http, recorder: Recorder, rnd: random.Random, email: str, allow_patch: bool) -> None:
+        self.http = http
+        self.recorder = recorder
+        self.rnd = rnd
+        self.email = email
+        self.allow_patch = allow_patch
+        self.user_id: int | None = None
+        self.headers: dict[str, str] = {}
+        self.order_ids: list[str] = []
+
+    async def call(self, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        resp = await self.http.request(method, url, **kwargs)
+        self.recorder.add(name, time.perf_counter() - started, resp.status_code < 400)
+        return resp
+
+    async def login(self) -> None:
+        password = "bench-password"
+        resp = await self.call("POST /register/", "POST", "/register/", json={"email": self.email, "password": password})
+        self.user_id = resp.json()["id"]
+        resp = await self.call("POST /token/", "POST", "/token/", data={"username": self.email, "password": password})
+        self.headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+    async def run(self, requests: int) -> None:
+        from app.services.cache_orders import delete_cached_order
+
+        ops = list(MIX)
+        weights = list(MIX.values())
+        for _ in range(requests):
+            op = self.rnd.choices(ops, weights)[0]
+            if not self.order_ids or (op == "patch" and not self.allow_patch):
+                op = "create"
+
+            if op == "create":
+                count = self.rnd.randint(1, 5)
+                price = self.rnd.choice((9.5, 19.0, 120.25))
+                body = {
+                    "items": [{"name_product": "Товар", "count_product": count, "price_product": price}],
+                    "total_price": count * price,
+                }
+                resp = await self.call("POST /orders/", "POST", "/orders/", json=body, headers=self.headers)
+                if resp.status_code == 201:
+                    self.order_ids.append(resp.json()["id"])
+            elif op == "get_cached":
+                order_id = self.rnd.choice(self.order_ids)
+                await self.call("GET /orders/{id}/ cached", "GET", f"/orders/{order_id}/", headers=self.headers)
+            elif op == "get_uncached":
+                order_id = self.rnd.choice(self.order_ids)
+                # сброс кеша вне замера: измеряем промах до БД
+                await delete_cached_order(order_id)
+                await self.call("GET /orders/{id}/ uncached", "GET", f"/orders/{order_id}/", headers=self.headers)
+            elif op == "patch":
+                order_id = self.rnd.choice(self.order_ids)
+                await self.call(
+                    "PATCH /orders/{id}/", "PATCH", f"/orders/{order_id}/",
+                    json={"status": self.rnd.choice(STATUSES)}, headers=self.headers,
+                )
+            else:
+                await self.call(
+                    "GET /orders/user/{user_id}/", "GET", f"/orders/user/{self.user_id}/?limit=50", headers=self.headers,
+                )
+
+
+async def run_pipeline(stop: asyncio.Event, counters: dict) -> None:
+    # outbox relay -> StubBroker -> обработчик пачки worker, без RabbitMQ и TaskIQ
+    from app import outbox_relay, tasks
+    from app.services import rabbit_publisher
+    from app.services.order_events import decode_order_event
+    from benchmarks.amqp_stub import StubBroker
+    from app.core.config import settings
+
+    broker = StubBroker(connect_latency=0, rtt=0)
+    rabbit_publisher.publisher = rabbit_publisher.RabbitPublisher(
+        settings.RABBIT_URL, settings.NEW_ORDER_QUEUE, pool_size=1, connect=broker.connect,
+    )
+    queue = broker.queues[settings.NEW_ORDER_QUEUE]
+
+    while not stop.is_set():
+        counters["published"] += await outbox_relay.relay_batch(settings.OUTBOX_BATCH_SIZE)
+        order_ids = []
+        while queue and len(order_ids) < settings.CONSUMER_BATCH_SIZE:
+            order_ids.append(decode_order_event(queue.popleft(), None).order_id)
+        if order_ids:
+            await tasks._process_batch(order_ids)
+            counters["processed"] += len(order_ids)
+        else:
+            await asyncio.sleep(0.01)
+
+
+async def run_phase(http, phase: int, concurrency: int, requests_per_user: int, seed: int, allow_patch: bool) -> dict:
+    recorder = Recorder()
+    users = [
+        VirtualUser(http, recorder, random.Random(seed * 100003 + phase * 1009 + i), f"bench-{phase}-{i}@example.com", allow_patch)
+        for i in range(concurrency)
+    ]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user.login() for user in users))
+    await asyncio.gather(*(user.run(requests_per_user) for user in users))
+    elapsed = time.perf_counter() - started
+
+    return {"concurrency": concurrency, "elapsed_s": round(elapsed, 3), **recorder.report(elapsed)}
+
+
+async def main_async(args: argparse.Namespace, database_url: str) -> dict:
+    import httpx
+
+    use_fakeredis()
+    await prepare_database(database_url)
+
+    from app.main import app, lifespan
+
+    allow_patch = not database_url.startswith("sqlite")
+    counters = {"published": 0, "processed": 0}
+    stop = asyncio.Event()
+    phases = []
+
+    async with lifespan(app):
+        pipeline = asyncio.create_task(run_pipeline(stop, counters)) if args.pipeline else None
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            for phase, concurrency in enumerate(args.concurrency):
+                phases.append(await run_phase(http, phase, concurrency, args.requests_per_user, args.seed, allow_patch))
+                print(
+                    f"concurrency={concurrency:<4} {phases[-1]['throughput_rps']:>9.1f} req/s",
+                    file=sys.stderr,
+                )
+        if pipeline is not None:
+            stop.set()
+            await pipeline
+
+    return {
+        "meta": {
+            "database": database_url.split(":", 1)[0],
+            "concurrency": args.concurrency,
+            "requests_per_user": args.requests_per_user,
+            "seed": args.seed,
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "pipeline": args.pipeline,
+            "mix": MIX,
+            # UPDATE ... RETURNING со значением из подзапроса SQLite не поддерживает
+            "patch_skipped": not allow_patch,
+            "python": platform.python_version(),
+        },
+        "pipeline": counters if args.pipeline else None,
+        "phases": phases,
+    }
+
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> int:
+    # регрессия - рост p99 или падение пропускной способности больше чем на threshold
+    with open(baseline_path) as f:
+        baseline = {phase["concurrency"]: phase for phase in json.load(f)["phases"]}
+    with open(current_path) as f:
+        current = {phase["concurrency"]: phase for phase in json.load(f)["phases"]}
+
+    regressions = []
+    for concurrency, phase in current.items():
+        base = baseline.get(concurrency)
+        if base is None:
+            continue
+        if phase["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(f"c={concurrency} throughput {base['throughput_rps']} -> {phase['throughput_rps']} req/s")
+        for name, stats in phase["endpoints"].items():
+            base_stats = base["endpoints"].get(name)
+            if base_stats and stats["p99_ms"] > base_stats["p99_ms"] * (1 + threshold):
+                regressions.append(f"c={concurrency} {name} p99 {base_stats['p99_ms']} -> {stats['p99_ms']} ms")
+
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print("OK: регрессий нет")
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=lambda v: [int(x) for x in v.split(",")], default=[1, 8, 32, 64])
+    parser.add_argument("--requests-per-user", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=None, help="по умолчанию SQLite во временном каталоге")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="4 - минимум bcrypt, чтобы логин не доминировал")
+    parser.add_argument("--pipeline", action="store_true", help="параллельно гонять outbox relay и обработку заказов")
+    parser.add_argument("--output", default=None, help="файл для JSON, по умолчанию stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), default=None)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{tmp}/bench.db"
+        configure_env(database_url, args.bcrypt_rounds)
+        result = asyncio.run(main_async(args, database_url))
+
+    body = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+
+
+if __name__ == "__main__":
+    main()
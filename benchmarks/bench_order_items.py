@@ -0,0 +1,76 @@
+"""Заказ с сотнями позиций: прежняя валидация (float) и хранение против Decimal и колонок.
+
+Чтение считается от текста колонки: драйвер разбирает JSONB через json.loads,
+компактный формат разбирается быстрее, зато список объектов собирается в Python.
+
+Запуск: python -m benchmarks.bench_order_items
+"""
+import argparse
+import json
+import timeit
+
+import orjson
+from pydantic import BaseModel, Field, model_validator
+
+from app.schemas.order import OrderCreateIn
+from app.services.order_items import pack_items, unpack_items
+
+
+class LegacyOrderItem(BaseModel):
+    name_product: str
+    count_product: int = Field(gt=0)
+    price_product: float = Field(gt=0)
+
+
+class LegacyOrderCreateIn(BaseModel):
+    items: list[LegacyOrderItem] = Field(min_length=1)
+    total_price: float = Field(gt=0)
+
+    @model_validator(mode="after")
+    def validate_total_price(self):
+        calculated_total = sum(item.count_product * item.price_product for item in self.items)
+        if abs(calculated_total - self.total_price) > 1e-6:
+            raise ValueError("Итоговая цена не соответствует сумме товаров")
+        return self
+
+
+def make_payload(items: int) -> dict:
+    return {
+        "items": [{"name_product": f"Товар {i}", "count_product": 3, "price_product": 0.1} for i in range(items)],
+        # копейки: 0.3 * items без погрешности float
+        "total_price": items * 3 / 10,
+    }
+
+
+def main(number: int, items: int) -> None:
+    payload = make_payload(items)
+    legacy = LegacyOrderCreateIn.model_validate(payload)
+    current = OrderCreateIn.model_validate(payload)
+    legacy_column = orjson.dumps([item.model_dump() for item in legacy.items]).decode()
+    packed_column = orjson.dumps(pack_items(current.items)).decode()
+
+    print(f"items={items}")
+    print(f"  jsonb size, before: {len(legacy_column.encode())} B")
+    print(f"  jsonb size, after:  {len(packed_column.encode())} B")
+
+    cases = {
+        "validate + dump, before": lambda: [
+            item.model_dump() for item in LegacyOrderCreateIn.model_validate(payload).items
+        ],
+        "validate + pack, after": lambda: pack_items(OrderCreateIn.model_validate(payload).items),
+        "read items, before": lambda: orjson.dumps(json.loads(legacy_column)),
+        "read items, after": lambda: orjson.dumps(unpack_items(json.loads(packed_column))),
+    }
+
+    print(f"{'case':>24} {'us/order':>10}")
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=number, repeat=5))
+        print(f"{name:>24} {best / number * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--items", type=int, default=500)
+    args = parser.parse_args()
+    main(args.number, args.items)
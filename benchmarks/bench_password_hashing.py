@@ -0,0 +1,72 @@
+"""Задержка event loop во время одновременных логинов: bcrypt в loop против пула потоков.
+
+Фоновая задача каждые 5 мс замеряет, насколько позже положенного она проснулась,
+это и есть задержка, которую видят все остальные запросы воркера.
+
+Запуск: python -m benchmarks.bench_password_hashing
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.security import PasswordHasher, pwd_context, verify_password
+
+TICK = 0.005
+
+
+async def measure_lag(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def run(logins: int, login) -> tuple[float, list[float]]:
+    stop = asyncio.Event()
+    lags: list[float] = []
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+    await asyncio.sleep(TICK * 2)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+    return elapsed, lags
+
+
+def report(name: str, elapsed: float, lags: list[float]) -> None:
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[int(len(lags_ms) * 0.99) - 1] if len(lags_ms) > 1 else lags_ms[0]
+    print(
+        f"{name:>8}: {elapsed:6.2f}s  loop lag median={statistics.median(lags_ms):7.1f}ms "
+        f"p99={p99:7.1f}ms max={lags_ms[-1]:7.1f}ms"
+    )
+
+
+async def main(logins: int, workers: int) -> None:
+    hashed = pwd_context.hash("password")
+
+    async def inline_login() -> None:
+        # прежнее поведение: синхронный bcrypt прямо в async-обработчике
+        await asyncio.sleep(0)
+        verify_password("password", hashed)
+
+    hasher = PasswordHasher(workers=workers, max_pending=logins)
+
+    async def pooled_login() -> None:
+        await hasher.verify_and_update("password", hashed)
+
+    report("inline", *await run(logins, inline_login))
+    report("pool", *await run(logins, pooled_login))
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.workers))
@@ -0,0 +1,69 @@
+"""Сравнение пропускной способности публикации new_order: connect-per-call против пула каналов.
+
+Запуск: python -m benchmarks.bench_publisher
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import aio_pika
+
+from app.services.rabbit_publisher import RabbitPublisher
+from benchmarks.amqp_stub import StubBroker
+
+QUEUE = "new_order"
+
+
+async def publish_per_call(broker: StubBroker, order_id: uuid.UUID) -> None:
+    # прежняя реализация publish_new_order: соединение, канал и очередь на каждый заказ
+    conn = await broker.connect("amqp://stub")
+    async with conn:
+        channel = await conn.channel()
+        await channel.declare_queue(QUEUE, durable=True)
+        message = aio_pika.Message(
+            body=json.dumps({"order_id": str(order_id)}).encode(),
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        )
+        await channel.default_exchange.publish(message, routing_key=QUEUE)
+
+
+async def run(total: int, concurrency: int, publish) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await publish(uuid.uuid4())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started)
+
+
+async def main(total: int, concurrency: int, pool_size: int) -> None:
+    broker = StubBroker()
+    per_call = await run(total, concurrency, lambda order_id: publish_per_call(broker, order_id))
+
+    broker = StubBroker()
+    publisher = RabbitPublisher("amqp://stub", QUEUE, pool_size=pool_size, connect=broker.connect)
+    await publisher.start()
+    pooled = await run(
+        total,
+        concurrency,
+        lambda order_id: publisher.publish(json.dumps({"order_id": str(order_id)}).encode()),
+    )
+    await publisher.close()
+
+    print(f"orders={total} concurrency={concurrency} pool_size={pool_size}")
+    print(f"per-call : {per_call:10.0f} orders/sec")
+    print(f"pooled   : {pooled:10.0f} orders/sec  (x{pooled / per_call:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--total", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.total, args.concurrency, args.pool_size))
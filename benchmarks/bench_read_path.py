@@ -0,0 +1,84 @@
+"""Выборка 10k заказов пользователя: ORM-сущности против Core select с явными колонками.
+
+Используется SQLite в памяти, поэтому абсолютные числа меньше, чем с PostgreSQL,
+но разница в стоимости гидратации строк та же.
+
+Запуск: python -m benchmarks.bench_read_path
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import orjson
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+import app.database.sqlite_compat  # noqa: F401
+from app.database.database import Base
+from app.database.models import OrderModel, UserModel
+from app.database.models.order_model import OrderStatus
+from app.database.repositories.order_read_repository import user_orders_query
+from app.services.order_payload import order_to_dict
+
+
+def seed(engine, orders: int, items: int) -> None:
+    Base.metadata.create_all(engine)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(UserModel).values(id=1, email="bench@example.com", hash_password="x", created_at=now))
+        conn.execute(insert(OrderModel), [
+            {
+                "id": uuid.uuid4(),
+                "user_id": 1,
+                "items": {"v": 1, "n": [f"Товар {j}" for j in range(items)], "q": [1] * items, "p": [999] * items},
+                "total_price": Decimal("9.99") * items,
+                "status": OrderStatus.PENDING,
+                "created_at": now - timedelta(seconds=i),
+            }
+            for i in range(orders)
+        ])
+
+
+def orm_path(engine) -> bytes:
+    with Session(engine) as session:
+        orders = session.execute(
+            select(OrderModel).where(OrderModel.user_id == 1).order_by(OrderModel.created_at.desc())
+        ).scalars().all()
+        return orjson.dumps([order_to_dict(o) for o in orders])
+
+
+def core_path(engine) -> bytes:
+    with engine.connect() as conn:
+        rows = conn.execute(user_orders_query(1)).all()
+        return orjson.dumps([order_to_dict(row) for row in rows])
+
+
+def measure(fn, engine, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(engine)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(orders: int, items: int, repeat: int) -> None:
+    engine = create_engine("sqlite://")
+    seed(engine, orders, items)
+
+    orm = measure(orm_path, engine, repeat)
+    core = measure(core_path, engine, repeat)
+    print(f"orders={orders} items/order={items}")
+    print(f"ORM entities : {orm * 1000:8.1f} ms")
+    print(f"Core columns : {core * 1000:8.1f} ms  (x{orm / core:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.orders, args.items, args.repeat)
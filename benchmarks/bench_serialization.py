@@ -0,0 +1,83 @@
+"""CPU-стоимость сериализации ответа с заказом: прежний путь против orjson и готовых байтов.
+
+Запуск: python -m benchmarks.bench_serialization
+"""
+import argparse
+import json
+import timeit
+import uuid
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app.database.models.order_model import OrderStatus
+from app.services.order_payload import order_to_dict, order_to_json
+
+
+class Row(NamedTuple):
+    id: uuid.UUID
+    user_id: int
+    items: list
+    total_price: float
+    status: OrderStatus
+    created_at: datetime
+
+
+def legacy_order_to_dict(order) -> dict:
+    return {
+        "id": str(order.id),
+        "user_id": order.user_id,
+        "items": order.items,
+        "total_price": order.total_price,
+        "status": order.status.value if hasattr(order.status, "value") else str(order.status),
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+    }
+
+
+def starlette_json(content) -> bytes:
+    # то, что делает JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def make_row(items: int) -> Row:
+    return Row(
+        id=uuid.uuid4(),
+        user_id=1,
+        items=[{"name_product": f"Товар {i}", "count_product": 2, "price_product": 10.5} for i in range(items)],
+        total_price=21.0 * items,
+        status=OrderStatus.PENDING,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+def main(number: int, items: int, page: int) -> None:
+    row = make_row(items)
+    rows = [make_row(items) for _ in range(page)]
+    cached_str = json.dumps(legacy_order_to_dict(row), default=str)
+    cached_bytes = b"1\n" + order_to_json(row)
+
+    cases = {
+        "one order, before": lambda: starlette_json(jsonable_encoder(legacy_order_to_dict(row))),
+        "one order, after": lambda: order_to_json(row),
+        "cache hit, before": lambda: starlette_json(jsonable_encoder(json.loads(cached_str))),
+        "cache hit, after": lambda: cached_bytes.partition(b"\n")[2],
+        f"list of {page}, before": lambda: starlette_json(jsonable_encoder([legacy_order_to_dict(r) for r in rows])),
+        f"list of {page}, after": lambda: orjson.dumps({"items": [order_to_dict(r) for r in rows]}),
+    }
+
+    print(f"{'case':>20} {'us/response':>12}")
+    for name, fn in cases.items():
+        n = max(1, number // page) if "list" in name else number
+        best = min(timeit.repeat(fn, number=n, repeat=5))
+        print(f"{name:>20} {best / n * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--page", type=int, default=50)
+    args = parser.parse_args()
+    main(args.number, args.items, args.page)
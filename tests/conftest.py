@@ -0,0 +1,98 @@
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+# настройки читаются при импорте app.core.config: окружение задаём до импорта приложения.
+# БД - SQLite во временном каталоге, Redis - fakeredis (пулы клиентов подменяются в фикстуре)
+_DB_DIR = tempfile.mkdtemp(prefix="orders-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_DB_DIR}/test.db",
+    "JWT_SECRET_KEY": "test-secret",
+    "JWT_ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "REDIS_URL": "redis://fakeredis:6379/0",
+    "ORDER_CACHE_EXPIRE_SECONDS": "300",
+    "RABBIT_URL": "amqp://stub",
+    "NEW_ORDER_QUEUE": "new_order",
+    "BCRYPT_ROUNDS": "4",
+    "TRACE_SAMPLE_RATE": "0",
+})
+
+import fakeredis
+import httpx
+import pytest
+from fakeredis.aioredis import FakeConnection
+from redis.asyncio import ConnectionPool
+from sqlalchemy import insert
+
+import app.database.sqlite_compat  # noqa: F401
+import app.database.models  # noqa: F401
+from app.core.redis import redis_binary_client, redis_client
+from app.database.database import Base
+from app.database.models import OrderModel
+from app.database.models.order_model import OrderStatus
+from app.database.session import asyncSessionLocal, engine
+from app.services.cache_invalidation import _local_caches
+
+
+@pytest.fixture
+async def fake_redis():
+    # свой сервер на тест: кеш, лимиты и счётчики не переходят между тестами
+    server = fakeredis.FakeServer()
+    for client, decode in ((redis_client, True), (redis_binary_client, False)):
+        client.connection_pool = ConnectionPool(
+            connection_class=FakeConnection, server=server, decode_responses=decode,
+        )
+    for cache in _local_caches.values():
+        cache.clear()
+    yield server
+
+
+@pytest.fixture
+async def database():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    # соединения aiosqlite привязаны к event loop теста
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(fake_redis, database):
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+@pytest.fixture
+async def user(client):
+    email = f"user-{uuid.uuid4().hex[:8]}@example.com"
+    resp = await client.post("/register/", json={"email": email, "password": "test-password"})
+    assert resp.status_code == 201, resp.text
+    user_id = resp.json()["id"]
+    resp = await client.post("/token/", data={"username": email, "password": "test-password"})
+    assert resp.status_code == 200, resp.text
+    return {"id": user_id, "headers": {"Authorization": f"Bearer {resp.json()['access_token']}"}}
+
+
+async def insert_order(
+    user_id: int, status: OrderStatus = OrderStatus.PENDING, created_at: datetime | None = None,
+) -> uuid.UUID:
+    # заказ напрямую в БД, минуя API
+    order_id = uuid.uuid4()
+    async with asyncSessionLocal() as db:
+        await db.execute(insert(OrderModel).values(
+            id=order_id,
+            user_id=user_id,
+            items={"v": 1, "n": ["Хлеб"], "q": [2], "p": [1050]},
+            total_price=Decimal("21.00"),
+            status=status,
+            created_at=created_at or datetime.now(timezone.utc),
+        ))
+        await db.commit()
+    return order_id
@@ -0,0 +1,56 @@
+from passlib.context import CryptContext
+from sqlalchemy import select
+
+from app.core import security
+from app.core.security import password_hasher
+from app.database.models.user_model import UserModel
+from app.database.session import asyncSessionLocal
+
+CREDENTIALS = {"email": "rehash@example.com", "password": "test-password"}
+LOGIN = {"username": CREDENTIALS["email"], "password": CREDENTIALS["password"]}
+
+
+async def stored_hash(email: str) -> str:
+    async with asyncSessionLocal() as db:
+        return (await db.execute(select(UserModel.hash_password).where(UserModel.email == email))).scalar_one()
+
+
+async def test_password_hasher_busy(client, monkeypatch):
+    # очередь bcrypt заполнена: отказ сразу, без ожидания пула
+    monkeypatch.setattr(password_hasher, "_max_pending", 0)
+
+    resp = await client.post("/register/", json=CREDENTIALS)
+
+    assert resp.status_code == 503, resp.text
+    assert resp.headers["Retry-After"] == "1"
+
+
+async def test_login_rehashes_outdated_password(client, monkeypatch):
+    resp = await client.post("/register/", json=CREDENTIALS)
+    assert resp.status_code == 201, resp.text
+    assert (await stored_hash(CREDENTIALS["email"])).startswith("$2b$04$")
+
+    # BCRYPT_ROUNDS увеличили: хеш пересчитывается при следующем успешном входе
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5))
+
+    resp = await client.post("/token/", data={**LOGIN, "password": "wrong-password"})
+    assert resp.status_code == 401
+    assert (await stored_hash(CREDENTIALS["email"])).startswith("$2b$04$")
+
+    resp = await client.post("/token/", data=LOGIN)
+    assert resp.status_code == 200, resp.text
+    assert (await stored_hash(CREDENTIALS["email"])).startswith("$2b$05$")
+
+    resp = await client.post("/token/", data=LOGIN)
+    assert resp.status_code == 200, resp.text
+
+
+async def test_password_hasher_restarts_after_shutdown(client):
+    # lifespan остановлен и запущен снова (тесты, встроенный сервер) - пул bcrypt пересоздаётся
+    password_hasher.shutdown()
+    password_hasher.shutdown()
+
+    resp = await client.post("/register/", json=CREDENTIALS)
+    assert resp.status_code == 201, resp.text
+    resp = await client.post("/token/", data=LOGIN)
+    assert resp.status_code == 200, resp.text
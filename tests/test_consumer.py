@@ -0,0 +1,83 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from app.consumer import OrderConsumer
+from app.services.order_events import CONTENT_TYPE_JSON, OrderEvent, decode_order_event, encode_order_event
+from benchmarks.amqp_stub import StubDelivery
+
+
+async def test_concurrent_flushes_ack_every_message_once():
+    # ack в заглушке уступает event loop, как настоящий aiormq; повторный tag - ошибка канала
+    dispatched: list[str] = []
+
+    async def dispatch(order_ids: list[str], trace_ids: list[str]) -> None:
+        await asyncio.sleep(0)
+        dispatched.extend(order_ids)
+
+    bodies = [json.dumps({"order_id": str(uuid.uuid4())}).encode() for _ in range(500)]
+    delivery = StubDelivery(prefetch_count=50)
+    consumer = OrderConsumer(dispatch, concurrency=8, batch_size=10)
+    consumer.start()
+
+    await delivery.deliver(bodies, consumer.on_message)
+    await asyncio.wait_for(delivery.wait_settled(), timeout=5)
+
+    assert len(dispatched) == len(bodies)
+    assert consumer.unacked == 0
+    assert all(not worker.done() for worker in consumer._workers)
+    await consumer.drain(timeout=1)
+
+
+class FailingAckMessage:
+    def __init__(self, delivery_tag: int, fail: bool) -> None:
+        self.delivery_tag = delivery_tag
+        self.body = json.dumps({"order_id": str(uuid.uuid4())}).encode()
+        self.content_type = None
+        self.headers = {}
+        self.fail = fail
+        self.acked = False
+
+    async def ack(self, multiple: bool = False) -> None:
+        if self.fail:
+            raise RuntimeError("channel closed")
+        self.acked = True
+
+    async def nack(self, requeue: bool = True) -> None:
+        return None
+
+
+async def test_worker_survives_ack_error():
+    async def dispatch(order_ids: list[str], trace_ids: list[str]) -> None:
+        return None
+
+    consumer = OrderConsumer(dispatch, concurrency=1, batch_size=1)
+    consumer.start()
+
+    # ack первой пачки падает (канал закрыт) - обработчик должен взять следующую
+    broken, healthy = FailingAckMessage(1, fail=True), FailingAckMessage(2, fail=False)
+    await consumer.on_message(broken)
+    await asyncio.sleep(0.01)
+    await consumer.on_message(healthy)
+    await asyncio.sleep(0.01)
+
+    assert healthy.acked
+    assert not consumer._workers[0].done()
+    await consumer.drain(timeout=1)
+
+
+def test_decode_order_event_formats():
+    order_id = uuid.uuid4()
+    event = OrderEvent("new_order", order_id)
+
+    for fmt in ("json", "binary"):
+        assert decode_order_event(*encode_order_event(event, fmt)) == event
+    # сообщения до конверта: без content-type, включая v0 - голую JSON-строку
+    assert decode_order_event(json.dumps({"order_id": str(order_id)}).encode(), None) == event
+    assert decode_order_event(json.dumps(str(order_id)).encode(), None) == event
+
+    for body in (b"[]", b'{"id": 1}', b'"not-a-uuid"'):
+        with pytest.raises(ValueError):
+            decode_order_event(body, CONTENT_TYPE_JSON)
@@ -0,0 +1,104 @@
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.database import session
+from app.database.database import Base
+from app.database.models import OrderModel
+from app.database.session import Replica, _check_replica, _connect_args, asyncSessionLocal, read_sessionmaker
+from app.services.read_your_writes import read_sessionmaker_for
+from tests.conftest import _DB_DIR
+from tests.test_order_create import ORDER
+
+
+def test_pgbouncer_mode_unique_statement_names(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PGBOUNCER_MODE", True)
+
+    args = _connect_args("postgresql+asyncpg://user@localhost/orders")
+
+    assert args["statement_cache_size"] == 0
+    assert args["prepared_statement_cache_size"] == 0
+    names = {args["prepared_statement_name_func"]() for _ in range(100)}
+    assert len(names) == 100
+    assert all(name.startswith("__asyncpg_") for name in names)
+
+
+def test_default_mode_keeps_statement_cache():
+    args = _connect_args("postgresql+asyncpg://user@localhost/orders")
+
+    assert args["statement_cache_size"] == settings.DB_STATEMENT_CACHE_SIZE
+    assert "prepared_statement_name_func" not in args
+    assert _connect_args("sqlite+aiosqlite:///orders.db") == {}
+
+
+@pytest.fixture
+async def replicas(database, monkeypatch):
+    # реплики - отдельные файлы SQLite со своей схемой, данные в них не реплицируются
+    stand_ins = [Replica(f"sqlite+aiosqlite:///{_DB_DIR}/replica-{i}.db") for i in range(2)]
+    for replica in stand_ins:
+        async with replica.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+    # список общий с read_your_writes, подменяем содержимое
+    monkeypatch.setattr(session, "_next_replica", 0)
+    session.replicas.extend(stand_ins)
+    yield stand_ins
+    session.replicas.clear()
+    for replica in stand_ins:
+        await replica.engine.dispose()
+
+
+async def insert_replica_order(replica: Replica, user_id: int) -> uuid.UUID:
+    order_id = uuid.uuid4()
+    async with replica.sessionmaker() as db:
+        await db.execute(insert(OrderModel).values(
+            id=order_id,
+            user_id=user_id,
+            items={"v": 1, "n": ["Хлеб"], "q": [1], "p": [100]},
+            total_price=Decimal("1.00"),
+            created_at=datetime.now(timezone.utc),
+        ))
+        await db.commit()
+    return order_id
+
+
+async def list_order_ids(client, user) -> list[str]:
+    resp = await client.get(f"/orders/user/{user['id']}/", headers=user["headers"])
+    assert resp.status_code == 200, resp.text
+    return [order["id"] for order in resp.json()["items"]]
+
+
+async def test_reads_go_to_replicas_round_robin(client, user, replicas):
+    first = await insert_replica_order(replicas[0], user["id"])
+    second = await insert_replica_order(replicas[1], user["id"])
+
+    assert [await list_order_ids(client, user) for _ in range(4)] == [[str(first)], [str(second)]] * 2
+
+
+async def test_unhealthy_replica_falls_back_to_primary(replicas):
+    broken = Replica(f"sqlite+aiosqlite:///{_DB_DIR}/missing/replica.db")
+    await _check_replica(broken)
+    assert not broken.healthy
+
+    replicas[0].healthy = False
+    assert {read_sessionmaker() for _ in range(4)} == {replicas[1].sessionmaker}
+
+    replicas[1].healthy = False
+    assert read_sessionmaker() is asyncSessionLocal
+    await broken.engine.dispose()
+
+
+async def test_user_reads_from_primary_after_write(client, user, replicas):
+    await insert_replica_order(replicas[0], user["id"])
+    assert await read_sessionmaker_for(user["id"]) is replicas[0].sessionmaker
+
+    resp = await client.post("/orders/", json=ORDER, headers=user["headers"])
+    assert resp.status_code == 201, resp.text
+
+    # метка read-your-writes: свой только что созданный заказ виден, хотя на репликах его нет
+    assert await read_sessionmaker_for(user["id"]) is asyncSessionLocal
+    assert await list_order_ids(client, user) == [resp.json()["id"]]
@@ -0,0 +1,77 @@
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.database.models import OrderOutboxModel
+from app.database.session import asyncSessionLocal
+
+ORDER = {
+    "items": [{"name_product": "Хлеб", "count_product": 2, "price_product": "10.50"}],
+    "total_price": "21.00",
+}
+
+
+async def test_create_order(client, user):
+    resp = await client.post("/orders/", json=ORDER, headers=user["headers"])
+
+    assert resp.status_code == 201, resp.text
+    created = resp.json()
+    assert created["status"] == "PENDING"
+    assert created["total_price"] == 21.0
+    assert resp.headers["ETag"] == '"1"'
+
+    async with asyncSessionLocal() as db:
+        outbox = (await db.execute(select(OrderOutboxModel))).scalars().all()
+    assert [str(row.order_id) for row in outbox] == [created["id"]]
+
+    resp = await client.get(f"/orders/{created['id']}/", headers=user["headers"])
+    assert resp.status_code == 200, resp.text
+    assert resp.json() == created
+
+
+async def test_create_order_rejects_overflowing_price(client, user):
+    item = {"name_product": "Хлеб", "count_product": 1, "price_product": "1e1000000"}
+
+    resp = await client.post("/orders/", json={"items": [item], "total_price": "1.00"}, headers=user["headers"])
+    assert resp.status_code == 422, resp.text
+
+    resp = await client.post(
+        "/orders/batch/", json={"orders": [{"items": [item], "total_price": "1.00"}]}, headers=user["headers"],
+    )
+    assert resp.status_code == 207, resp.text
+    assert resp.json()["results"][0]["ok"] is False
+
+
+async def test_create_orders_batch_per_item_results(client, user):
+    invalid = {"items": ORDER["items"], "total_price": "99.00"}
+
+    resp = await client.post(
+        "/orders/batch/", json={"orders": [ORDER, invalid, {"items": []}, ORDER]}, headers=user["headers"],
+    )
+
+    assert resp.status_code == 207, resp.text
+    body = resp.json()
+    assert (body["created"], body["failed"]) == (2, 2)
+    assert [result["index"] for result in body["results"]] == [0, 1, 2, 3]
+    assert [result["ok"] for result in body["results"]] == [True, False, False, True]
+    assert "Итоговая цена" in body["results"][1]["errors"][0]["msg"]
+    assert body["results"][2]["errors"][0]["loc"] == ["items"]
+
+    # созданные заказы сразу лежат в кеше и видны в списке
+    created = [result["order"]["id"] for result in body["results"] if result["ok"]]
+    for order_id in created:
+        resp = await client.get(f"/orders/{order_id}/", headers=user["headers"])
+        assert resp.status_code == 200, resp.text
+        assert resp.json()["status"] == "PENDING"
+
+    async with asyncSessionLocal() as db:
+        outbox = (await db.execute(select(OrderOutboxModel))).scalars().all()
+    assert sorted(str(row.order_id) for row in outbox) == sorted(created)
+
+
+async def test_create_orders_batch_size_limit(client, user):
+    orders = [ORDER] * (settings.ORDER_BATCH_MAX_SIZE + 1)
+
+    resp = await client.post("/orders/batch/", json={"orders": orders}, headers=user["headers"])
+
+    assert resp.status_code == 422, resp.text
+    assert resp.json()["detail"][0]["loc"] == ["body", "orders"]
@@ -0,0 +1,30 @@
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import orjson
+from asyncpg.pgproto import pgproto
+
+from app.database.models.order_model import OrderStatus
+from app.services.order_payload import order_to_json
+
+
+def test_order_to_json_accepts_asyncpg_uuid():
+    # asyncpg отдаёт свой подкласс UUID, orjson сериализует только точный uuid.UUID
+    order_id = pgproto.UUID(str(uuid.uuid4()))
+    order = SimpleNamespace(
+        id=order_id,
+        user_id=1,
+        items={"v": 1, "n": ["Хлеб"], "q": [1], "p": [999]},
+        total_price=Decimal("9.99"),
+        status=OrderStatus.PAID,
+        created_at=datetime.now(timezone.utc),
+        version=2,
+    )
+
+    body = orjson.loads(order_to_json(order))
+
+    assert body["id"] == str(order_id)
+    assert body["items"] == [{"name_product": "Хлеб", "count_product": 1, "price_product": 9.99}]
+    assert body["status"] == "PAID"
@@ -0,0 +1,193 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import orjson
+from sqlalchemy import delete, insert, select
+
+from app.core.redis import redis_binary_client
+from app.database.models.order_model import OrderStatus
+from app.database.repositories.order_read_repository import archive, fetch_last_modified, fetch_order, orders
+from app.database.session import asyncSessionLocal
+from app.services import cache_invalidation
+from app.services.cache_orders import _NEGATIVE, CachedOrder, get_cache_stats, get_order_cached
+from app.services.order_partitions import MOVED_COLUMNS
+from tests.conftest import insert_order
+
+
+def test_processes_import():
+    import app.consumer  # noqa: F401
+    import app.main  # noqa: F401
+    import app.tasks  # noqa: F401
+
+
+async def test_fetch_order_reads_all_columns(client, user):
+    order_id = await insert_order(user["id"])
+
+    async with asyncSessionLocal() as db:
+        row = await fetch_order(db, order_id)
+
+    assert row.id == order_id
+    assert row.items == {"v": 1, "n": ["Хлеб"], "q": [2], "p": [1050]}
+    assert row.version == 1
+
+
+async def test_user_orders_list(client, user):
+    order_id = await insert_order(user["id"])
+
+    resp = await client.get(f"/orders/user/{user['id']}/", headers=user["headers"])
+
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert [order["id"] for order in body["items"]] == [str(order_id)]
+    assert body["items"][0]["items"] == [{"name_product": "Хлеб", "count_product": 2, "price_product": 10.5}]
+    assert body["items"][0]["total_price"] == 21.0
+
+
+async def test_last_modified_counts_archived_orders(client, user):
+    order_id = await insert_order(user["id"], OrderStatus.SHIPPED)
+    archived_at = datetime.now(timezone.utc) + timedelta(hours=1)
+
+    async with asyncSessionLocal() as db:
+        before = await fetch_last_modified(db, user["id"])
+        # job обслуживания перенёс заказ в архив: в списке его больше нет
+        row = (await db.execute(select(*(orders.c[name] for name in MOVED_COLUMNS)).where(orders.c.id == order_id))).one()
+        await db.execute(insert(archive).values(**row._mapping, archived_at=archived_at))
+        await db.execute(delete(orders).where(orders.c.id == order_id))
+        await db.commit()
+
+        after = await fetch_last_modified(db, user["id"])
+
+    assert before is not None
+    assert after.replace(tzinfo=None) == archived_at.replace(tzinfo=None)
+
+
+async def test_user_orders_keyset_pages(client, user):
+    now = datetime.now(timezone.utc)
+    # два заказа с одинаковым created_at: порядок внутри секунды держит id
+    created = [now - timedelta(minutes=minutes) for minutes in (0, 1, 1, 2, 3)]
+    ids = [await insert_order(user["id"], created_at=created_at) for created_at in created]
+    expected = [str(order_id) for _, order_id in sorted(zip(created, ids), key=lambda pair: (pair[0], pair[1]), reverse=True)]
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        resp = await client.get(f"/orders/user/{user['id']}/", params=params, headers=user["headers"])
+        assert resp.status_code == 200, resp.text
+        body = resp.json()
+        pages.append([order["id"] for order in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [order_id for page in pages for order_id in page] == expected
+
+    resp = await client.get(f"/orders/user/{user['id']}/", params={"cursor": "bad"}, headers=user["headers"])
+    assert resp.status_code == 400
+
+
+async def test_user_orders_ndjson_stream(client, user):
+    now = datetime.now(timezone.utc)
+    ids = [await insert_order(user["id"], created_at=now - timedelta(minutes=i)) for i in range(3)]
+
+    resp = await client.get(f"/orders/user/{user['id']}/", params={"format": "ndjson"}, headers=user["headers"])
+
+    assert resp.status_code == 200, resp.text
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    lines = resp.content.splitlines()
+    assert [orjson.loads(line)["id"] for line in lines] == [str(order_id) for order_id in ids]
+
+
+async def test_order_cache_single_flight(fake_redis):
+    order_id = str(uuid.uuid4())
+    entry = CachedOrder(order_id, 1, 1, b"{}")
+    started, release = asyncio.Event(), asyncio.Event()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        started.set()
+        await release.wait()
+        return entry
+
+    coalesced = get_cache_stats()["coalesced"]
+    first = asyncio.create_task(get_order_cached(order_id, loader))
+    await started.wait()
+    # остальные промахи приходят, пока первая загрузка ещё идёт
+    waiting = [asyncio.create_task(get_order_cached(order_id, loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(first, *waiting) == [entry] * 4
+    assert calls == 1
+    assert get_cache_stats()["coalesced"] - coalesced == 3
+
+
+async def test_order_cache_negative(client, user, fake_redis):
+    order_id = uuid.uuid4()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return None
+
+    assert await get_order_cached(order_id, loader) is None
+    assert await redis_binary_client.get(f"order:{order_id}") == _NEGATIVE
+
+    # метка "заказа нет" отвечает и из памяти процесса, и из redis
+    assert await get_order_cached(order_id, loader) is None
+    cache_invalidation._local_caches["order"].clear()
+    assert await get_order_cached(order_id, loader) is None
+    assert calls == 1
+
+    resp = await client.get(f"/orders/{order_id}/", headers=user["headers"])
+    assert resp.status_code == 404, resp.text
+
+
+async def test_get_order_if_none_match(client, user):
+    order_id = await insert_order(user["id"])
+
+    resp = await client.get(f"/orders/{order_id}/", headers=user["headers"])
+    assert resp.status_code == 200, resp.text
+    etag = resp.headers["ETag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"0", {etag}'):
+        resp = await client.get(f"/orders/{order_id}/", headers={**user["headers"], "If-None-Match": if_none_match})
+        assert resp.status_code == 304, resp.text
+        assert resp.headers["ETag"] == etag
+        assert not resp.content
+
+    resp = await client.get(f"/orders/{order_id}/", headers={**user["headers"], "If-None-Match": '"0"'})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["id"] == str(order_id)
+
+
+async def test_user_orders_if_modified_since(client, user):
+    order_id = await insert_order(user["id"])
+    settled = datetime.now(timezone.utc) - timedelta(minutes=5)
+    async with asyncSessionLocal() as db:
+        await db.execute(orders.update().where(orders.c.id == order_id).values(updated_at=settled))
+        await db.commit()
+
+    resp = await client.get(f"/orders/user/{user['id']}/", headers=user["headers"])
+    assert resp.status_code == 200, resp.text
+    last_modified = resp.headers["Last-Modified"]
+
+    resp = await client.get(
+        f"/orders/user/{user['id']}/", headers={**user["headers"], "If-Modified-Since": last_modified},
+    )
+    assert resp.status_code == 304, resp.text
+    assert resp.headers["Last-Modified"] == last_modified
+    assert not resp.content
+
+    # только что изменённый список: Last-Modified не отдаём, 304 тоже
+    await insert_order(user["id"])
+    resp = await client.get(
+        f"/orders/user/{user['id']}/", headers={**user["headers"], "If-Modified-Since": last_modified},
+    )
+    assert resp.status_code == 200, resp.text
+    assert "Last-Modified" not in resp.headers
+    assert len(resp.json()["items"]) == 2
@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.order import OrderCreateIn
+from app.services.order_items import pack_items
+
+
+def order(price, count: int = 3, total=None) -> dict:
+    return {
+        "items": [{"name_product": "Хлеб", "count_product": count, "price_product": price}],
+        "total_price": total if total is not None else str(Decimal(str(price)) * count),
+    }
+
+
+@pytest.mark.parametrize("price, cents", [
+    (0.1, 10),
+    (10.5, 1050),
+    ("10.50", 1050),
+    (Decimal("0.01"), 1),
+    (7, 700),
+    (9999999999.99, 999999999999),
+    ("9999999999.99", 999999999999),
+])
+def test_price_to_cents(price, cents):
+    data = OrderCreateIn.model_validate(order(price, count=1))
+
+    assert pack_items(data.items)["p"] == [cents]
+
+
+@pytest.mark.parametrize("price", [
+    0, -1.5, 10.001, "10.001", 1e10, "1e10", "abc", True, float("inf"), float("nan"), None,
+    "Infinity", "1e1000000", "1e999990", "1e-1000000",
+])
+def test_invalid_price(price):
+    with pytest.raises(ValidationError) as e:
+        OrderCreateIn.model_validate(order(price, count=1, total="1.00"))
+
+    assert [error["loc"] for error in e.value.errors()] == [("items", 0, "price_product")]
+
+
+def test_total_price_exact():
+    assert OrderCreateIn.model_validate(order(0.1, count=3, total=0.3))
+
+    with pytest.raises(ValidationError, match="Итоговая цена"):
+        OrderCreateIn.model_validate(order(0.1, count=3, total="0.31"))
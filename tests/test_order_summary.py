@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+from app.core.redis import TracedPipeline, redis_client
+from app.database.models.order_model import OrderStatus
+from app.services import order_summary
+from app.services.order_summary import apply_summary_deltas, created_deltas, get_status_summary
+from tests.conftest import insert_order
+from tests.test_order_create import ORDER
+
+
+async def test_summary_warms_and_applies_deltas(client, user, fake_redis):
+    await insert_order(user["id"])
+
+    summary = await get_status_summary(user["id"])
+    assert summary[OrderStatus.PENDING.value] == {"count": 1, "total_price": 21.0}
+
+    await apply_summary_deltas(created_deltas(user["id"], [Decimal("4.50")]))
+
+    summary = await get_status_summary(user["id"])
+    assert summary[OrderStatus.PENDING.value] == {"count": 2, "total_price": 25.5}
+
+
+async def test_summary_not_cached_when_order_changes_during_warmup(client, user, fake_redis, monkeypatch):
+    await insert_order(user["id"])
+    session_factory = order_summary.asyncSessionLocal
+
+    def session_with_concurrent_write():
+        # заказ создан и его дельта применена, пока сводка читалась из БД:
+        # снимок заказ не видит, записывать его в redis нельзя
+        session = session_factory()
+        original_execute = session.execute
+
+        async def execute(*args, **kwargs):
+            res = await original_execute(*args, **kwargs)
+            await apply_summary_deltas(created_deltas(user["id"], [Decimal("4.50")]))
+            return res
+
+        session.execute = execute
+        return session
+
+    monkeypatch.setattr(order_summary, "asyncSessionLocal", session_with_concurrent_write)
+    summary = await get_status_summary(user["id"])
+    assert summary[OrderStatus.PENDING.value] == {"count": 1, "total_price": 21.0}
+    assert not await order_summary.redis_client.exists(order_summary._key(user["id"]))
+
+    monkeypatch.setattr(order_summary, "asyncSessionLocal", session_factory)
+    await insert_order(user["id"])
+    summary = await get_status_summary(user["id"])
+    assert summary[OrderStatus.PENDING.value] == {"count": 2, "total_price": 42.0}
+
+
+async def test_summary_accepts_naive_dates(client, user):
+    resp = await client.get(
+        f"/orders/user/{user['id']}/summary/",
+        params={"date_from": "2999-01-01T00:00:00"},
+        headers=user["headers"],
+    )
+
+    assert resp.status_code == 400, resp.text
+
+
+async def test_order_writes_single_round_trip(client, user, fake_redis, monkeypatch):
+    await get_status_summary(user["id"])
+    await apply_summary_deltas(created_deltas(user["id"], [Decimal("1.00")]))
+
+    pipelines = []
+    script_checks = []
+    original_execute = TracedPipeline.execute
+    original_load_scripts = TracedPipeline.load_scripts
+
+    async def execute(self, raise_on_error=True):
+        pipelines.append([command[0][0] for command in self.command_stack])
+        return await original_execute(self, raise_on_error)
+
+    async def load_scripts(self):
+        script_checks.append(len(self.scripts))
+        return await original_load_scripts(self)
+
+    monkeypatch.setattr(TracedPipeline, "execute", execute)
+    monkeypatch.setattr(TracedPipeline, "load_scripts", load_scripts)
+
+    resp = await client.post("/orders/", json=ORDER, headers=user["headers"])
+    assert resp.status_code == 201, resp.text
+
+    # кеш заказа, инвалидация и дельта сводки - один pipeline, без SCRIPT EXISTS
+    assert pipelines == [["EVALSHA", "SETEX", "PUBLISH"]]
+    assert not script_checks
+
+    summary = await get_status_summary(user["id"])
+    assert summary[OrderStatus.PENDING.value] == {"count": 2, "total_price": 22.0}
+
+
+async def test_order_writes_load_missing_script(client, user, fake_redis):
+    await get_status_summary(user["id"])
+    # после SCRIPT FLUSH (перезапуск redis) EVALSHA получает NOSCRIPT, дельта применяется повтором
+    await redis_client.script_flush()
+
+    resp = await client.post("/orders/", json=ORDER, headers=user["headers"])
+    assert resp.status_code == 201, resp.text
+
+    summary = await get_status_summary(user["id"])
+    assert summary[OrderStatus.PENDING.value] == {"count": 1, "total_price": 21.0}
@@ -0,0 +1,72 @@
+import uuid
+from types import SimpleNamespace
+
+import orjson
+from asyncpg.pgproto import pgproto
+
+from app.core.redis import redis_binary_client
+from app.database.models.order_model import OrderStatus
+from app.services.order_updates import UPDATES_STREAM, hub, publish_order_updates, read_backlog, sse_stream
+
+
+async def test_publish_order_updates_accepts_asyncpg_rows(fake_redis):
+    order_id = pgproto.UUID(str(uuid.uuid4()))
+    row = SimpleNamespace(id=order_id, user_id=7, status=OrderStatus.PAID, version=2)
+
+    await publish_order_updates([row])
+
+    entries = await redis_binary_client.xrange(UPDATES_STREAM)
+    assert len(entries) == 1
+    fields = entries[0][1]
+    assert int(fields[b"u"]) == 7
+    assert orjson.loads(fields[b"d"]) == {"order_id": str(order_id), "status": "PAID", "version": 2}
+
+
+async def test_backlog_only_returns_events_of_user(fake_redis):
+    first = SimpleNamespace(id=uuid.uuid4(), user_id=1, status=OrderStatus.PAID, version=2)
+    await publish_order_updates([first])
+    (start_id, _), = await redis_binary_client.xrange(UPDATES_STREAM)
+
+    other = SimpleNamespace(id=uuid.uuid4(), user_id=2, status=OrderStatus.PAID, version=2)
+    mine = SimpleNamespace(id=uuid.uuid4(), user_id=1, status=OrderStatus.SHIPPED, version=3)
+    await publish_order_updates([other, mine])
+
+    backlog = await read_backlog(1, start_id.decode())
+
+    assert [orjson.loads(data)["order_id"] for _, data in backlog] == [str(mine.id)]
+
+
+async def test_sse_replays_backlog_after_last_event_id(fake_redis):
+    rows = [SimpleNamespace(id=uuid.uuid4(), user_id=1, status=OrderStatus.PAID, version=2) for _ in range(3)]
+    await publish_order_updates(rows)
+    entry_ids = [entry_id.decode() for entry_id, _ in await redis_binary_client.xrange(UPDATES_STREAM)]
+
+    stream = sse_stream(1, entry_ids[0])
+    try:
+        assert await anext(stream) == b"retry: 3000\n\n"
+        replayed = [await anext(stream), await anext(stream)]
+        assert [event.split(b"\n")[0].decode() for event in replayed] == [f"id: {entry_id}" for entry_id in entry_ids[1:]]
+        assert str(rows[1].id).encode() in replayed[0]
+
+        # событие из истории, пришедшее ещё и через подписку, второй раз не отправляется
+        fields = {b"u": b"1", b"d": b"{}"}
+        hub._dispatch(entry_ids[2], fields)
+        hub._dispatch("99999999999999-0", fields)
+        assert await anext(stream) == b"id: 99999999999999-0\nevent: order_status\ndata: {}\n\n"
+    finally:
+        await stream.aclose()
+
+
+async def test_sse_reset_when_backlog_trimmed(fake_redis):
+    rows = [SimpleNamespace(id=uuid.uuid4(), user_id=1, status=OrderStatus.PAID, version=2) for _ in range(3)]
+    await publish_order_updates(rows)
+    (first_id, _), *_ = await redis_binary_client.xrange(UPDATES_STREAM)
+    await redis_binary_client.xtrim(UPDATES_STREAM, maxlen=1, approximate=False)
+
+    for last_event_id in (first_id.decode(), "not-an-id"):
+        stream = sse_stream(1, last_event_id)
+        try:
+            assert await anext(stream) == b"retry: 3000\n\n"
+            assert await anext(stream) == b"event: reset\ndata: {}\n\n"
+        finally:
+            await stream.aclose()
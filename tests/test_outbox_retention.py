@@ -0,0 +1,29 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+
+from app.database.models import OrderOutboxModel
+from app.database.session import asyncSessionLocal
+from app.services.order_outbox import purge_sent_events
+
+
+async def test_purge_sent_events(database):
+    now = datetime.now(timezone.utc)
+    sent = [now - timedelta(days=10), now - timedelta(days=9), now - timedelta(days=8), now - timedelta(days=1), None]
+    async with asyncSessionLocal() as db:
+        await db.execute(insert(OrderOutboxModel).values([
+            {"order_id": uuid.uuid4(), "event_type": "new_order", "payload": {}, "sent_at": sent_at}
+            for sent_at in sent
+        ]))
+        await db.commit()
+
+        # пачками: старые отправленные удаляются, свежие и неотправленные остаются
+        assert await purge_sent_events(db, timedelta(days=7), 2, now) == 2
+        assert await purge_sent_events(db, timedelta(days=7), 2, now) == 1
+        assert await purge_sent_events(db, timedelta(days=7), 2, now) == 0
+        await db.commit()
+
+        left = (await db.execute(select(OrderOutboxModel.sent_at).order_by(OrderOutboxModel.id))).scalars().all()
+    assert len(left) == 2
+    assert left[1] is None
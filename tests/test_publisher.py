@@ -0,0 +1,48 @@
+import pytest
+
+from app.services.rabbit_publisher import RabbitPublisher
+from benchmarks.amqp_stub import StubBroker, StubConnection
+
+
+class FlakyBroker(StubBroker):
+    # первое соединение падает на открытии третьего канала
+    def __init__(self) -> None:
+        super().__init__(connect_latency=0, rtt=0)
+        self.connections: list[StubConnection] = []
+
+    async def connect(self, url: str) -> StubConnection:
+        connection = await super().connect(url)
+        if not self.connections:
+            opened = 0
+            channel = connection.channel
+
+            async def failing_channel(publisher_confirms: bool = True):
+                nonlocal opened
+                opened += 1
+                if opened == 3:
+                    raise ConnectionError("channel.open failed")
+                return await channel(publisher_confirms)
+
+            connection.channel = failing_channel
+        self.connections.append(connection)
+        return connection
+
+
+async def test_publisher_start_retry_after_partial_failure():
+    broker = FlakyBroker()
+    publisher = RabbitPublisher("amqp://stub", "new_order", pool_size=4, connect=broker.connect)
+
+    with pytest.raises(ConnectionError):
+        await publisher.start()
+    assert not publisher.is_started
+    assert broker.connections[0].is_closed
+
+    await publisher.start()
+    assert publisher.is_started
+    assert len(publisher._channels) == 4
+
+    for i in range(8):
+        await publisher.publish(b"%d" % i)
+    assert len(broker.queues["new_order"]) == 8
+
+    await publisher.close()
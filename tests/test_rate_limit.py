@@ -0,0 +1,32 @@
+from app.core.config import settings
+from app.core.rate_limit import parse_rate
+from app.core.redis import redis_client
+from app.services.cache_invalidation import _local_caches
+from tests.conftest import insert_order
+
+
+async def test_get_order_pipelined_rate_limit(client, user):
+    # промах кеша процесса: GET из redis и проверка лимита уходят одним pipeline
+    order_id = await insert_order(user["id"])
+    limit, _ = parse_rate(settings.RATE_LIMIT_ORDER_GET)
+
+    for _ in range(limit):
+        _local_caches["order"].clear()
+        resp = await client.get(f"/orders/{order_id}/", headers=user["headers"])
+        assert resp.status_code == 200, resp.text
+        assert resp.json()["id"] == str(order_id)
+
+    _local_caches["order"].clear()
+    resp = await client.get(f"/orders/{order_id}/", headers=user["headers"])
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+async def test_pipelined_check_loads_missing_script(client, user):
+    # после SCRIPT FLUSH (перезапуск redis) EVALSHA в pipeline получает NOSCRIPT, проверка не падает
+    order_id = await insert_order(user["id"])
+    await redis_client.script_flush()
+
+    resp = await client.get(f"/orders/{order_id}/", headers=user["headers"])
+
+    assert resp.status_code == 200, resp.text
@@ -0,0 +1,36 @@
+from app.core.config import settings
+from app.core.redis import redis_client
+from app.database.models.order_model import OrderStatus
+from app.database.repositories.order_read_repository import fetch_order
+from app.database.session import asyncSessionLocal
+from app.tasks import _claim, _process_batch, _processed_key
+from tests.conftest import insert_order
+
+
+async def test_process_batch_pays_once(client, user):
+    order_id = await insert_order(user["id"])
+
+    await _process_batch([order_id, order_id])
+    await _process_batch([order_id])
+
+    async with asyncSessionLocal() as db:
+        row = await fetch_order(db, order_id)
+    assert row.status == OrderStatus.PAID
+    assert row.version == 2
+    assert await redis_client.ttl(_processed_key(order_id)) > settings.ORDER_CLAIM_TTL_SECONDS
+
+
+async def test_claim_of_crashed_worker_expires(client, user):
+    order_id = await insert_order(user["id"])
+
+    # воркер взял заказ и упал до commit: ключ короткий, заказ остался PENDING
+    assert await _claim([order_id]) == [order_id]
+    assert 0 < await redis_client.ttl(_processed_key(order_id)) <= settings.ORDER_CLAIM_TTL_SECONDS
+
+    # ключ истёк - повторная доставка обрабатывает заказ
+    await redis_client.delete(_processed_key(order_id))
+    await _process_batch([order_id])
+
+    async with asyncSessionLocal() as db:
+        row = await fetch_order(db, order_id)
+    assert row.status == OrderStatus.PAID